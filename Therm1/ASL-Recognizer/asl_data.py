@@ -1,4 +1,8 @@
+import hashlib
+import json
 import os
+import shutil
+import tempfile
 
 import numpy as np
 import pandas as pd
@@ -23,6 +27,7 @@ class AslDb(object):
     def __init__(self,
                  hands_fn=os.path.join('data', 'hands_condensed.csv'),
                  speakers_fn=os.path.join('data', 'speaker.csv'),
+                 cache_dir=None,
                  ):
         """ loads ASL database from csv files with hand position information by frame, and speaker information
 
@@ -32,6 +37,10 @@ class AslDb(object):
         :param speakers_fn:
             filename of video speaker csv mapping with expected format:
                 video,speaker
+        :param cache_dir: str
+            optional directory for a binary cache of the frame table and of the (X, lengths) arrays built
+            by build_training/build_test, keyed by the csv file contents and the feature data; arrays are
+            memory-mapped from the cache so several processes share the same pages
 
         Instance variables:
             df: pandas dataframe
@@ -43,8 +52,43 @@ class AslDb(object):
                   2         149     181      170      175     161      62  woman-1
 
         """
-        self.df = pd.read_csv(hands_fn).merge(pd.read_csv(speakers_fn),on='video')
-        self.df.set_index(['video','frame'], inplace=True)
+        self.cache_dir = cache_dir
+        self.df = None
+        if cache_dir is not None:
+            frames_key = hash_strings([file_hash(hands_fn), file_hash(speakers_fn)])
+            frames_dir = os.path.join(cache_dir, 'frames-' + frames_key)
+            self.df = load_frame_cache(frames_dir)
+        if self.df is None:
+            self.df = pd.read_csv(hands_fn).merge(pd.read_csv(speakers_fn),on='video')
+            self.df.set_index(['video','frame'], inplace=True)
+            if cache_dir is not None:
+                save_frame_cache(frames_dir, self.df)
+
+    def get_Xlengths(self, csvfile, segments, feature_list, keys):
+        """ (X, lengths) tuples for segments of frames, served from the cache directory when one is set
+
+        The cache entry is keyed by the segment csv contents, the feature names and the feature values
+        currently in df, so redefining a derived feature column invalidates it.
+
+        :param csvfile: str
+            filename the segments were read from
+        :param segments: pandas DataFrame with video, startframe and endframe columns
+        :param feature_list: list of str feature labels
+        :param keys: list of dictionary keys, one per row of segments
+        :return: dict of (X, lengths) tuples, see load_Xlengths
+        """
+        if self.cache_dir is None:
+            return load_Xlengths(self, segments, feature_list, keys)
+        features = self.df[feature_list]
+        key = hash_strings([file_hash(csvfile), json.dumps(feature_list), str(features.dtypes.tolist()),
+                            hashlib.sha1(np.ascontiguousarray(features.values)).hexdigest()])
+        xlengths_dir = os.path.join(self.cache_dir, 'xlengths-' + key)
+        seq_dict = load_Xlengths_cache(xlengths_dir)
+        if seq_dict is None:
+            seq_dict = load_Xlengths(self, segments, feature_list, keys)
+            save_Xlengths_cache(xlengths_dir, seq_dict)
+            seq_dict = load_Xlengths_cache(xlengths_dir)
+        return seq_dict
 
     def build_training(self, feature_list, csvfilename =os.path.join('data', 'train_words.csv')):
         """ wrapper creates sequence data objects for training words suitable for hmmlearn library
@@ -83,13 +127,13 @@ class WordsData(object):
                 video,speaker,word,startframe,endframe
         :param feature_list: list of str feature labels
         """
-        self._data = self._load_data(asl, csvfile, feature_list)
-        self._hmm_data = create_hmmlearn_data(self._data)
-        self.num_items = len(self._data)
-        self.words = list(self._data.keys())
+        self._hmm_data = self._load_data(asl, csvfile, feature_list)
+        self._data = None
+        self.num_items = len(self._hmm_data)
+        self.words = list(self._hmm_data.keys())
 
     def _load_data(self, asl, fn, feature_list):
-        """ Consolidates sequenced feature data into a dictionary of words
+        """ Consolidates sequenced feature data into a dictionary of words as (X, lengths) tuples
 
         :param asl: ASLdata object
         :param fn: str
@@ -98,21 +142,7 @@ class WordsData(object):
         :return: dict
         """
         tr_df = pd.read_csv(fn)
-        dict = {}
-        for i in range(len(tr_df)):
-            word = tr_df.ix[i,'word']
-            video = tr_df.ix[i,'video']
-            new_sequence = [] # list of sample lists for a sequence
-            for frame in range(tr_df.ix[i,'startframe'], tr_df.ix[i,'endframe']+1):
-                vid_frame = video, frame
-                sample = [asl.df.ix[vid_frame][f] for f in feature_list]
-                if len(sample) > 0:  # dont add if not found
-                    new_sequence.append(sample)
-            if word in dict:
-                dict[word].append(new_sequence) # list of sequences
-            else:
-                dict[word] = [new_sequence]
-        return dict
+        return asl.get_Xlengths(fn, tr_df, feature_list, list(tr_df['word']))
 
     def get_all_sequences(self):
         """ getter for entire db of words as series of sequences of feature lists for each frame
@@ -122,6 +152,8 @@ class WordsData(object):
                 {'FRANK': [[[87, 225], [87, 225], ...], [[88, 219], [88, 219], ...]]],
                 ...}
         """
+        if self._data is None:
+            self._data = create_sequences(self._hmm_data)
         return self._data
 
     def get_all_Xlengths(self):
@@ -143,7 +175,7 @@ class WordsData(object):
             lists of feature list sequence lists for given word
                 [[[87, 225], [87, 225], ...], [[88, 219], [88, 219], ...]]]
         """
-        return self._data[word]
+        return self.get_all_sequences()[word]
 
     def get_word_Xlengths(self, word:str):
         """ getter for single word (X, lengths) tuple for use with hmmlearn library
@@ -171,40 +203,24 @@ class SinglesData(object):
                 video,speaker,word,startframe,endframe
         :param feature_list: list str of feature labels
         """
+        self.csvfile = csvfile
         self.df = pd.read_csv(csvfile)
         self.wordlist = list(self.df['word'])
         self.sentences_index  = self._load_sentence_word_indices()
-        self._data = self._load_data(asl, feature_list)
-        self._hmm_data = create_hmmlearn_data(self._data)
-        self.num_items = len(self._data)
+        self._hmm_data = self._load_data(asl, feature_list)
+        self._data = None
+        self.num_items = len(self._hmm_data)
         self.num_sentences = len(self.sentences_index)
 
-    # def _load_data(self, asl, fn, feature_method):
     def _load_data(self, asl, feature_list):
-        """ Consolidates sequenced feature data into a dictionary of words and creates answer list of words in order
-        of index used for dictionary keys
+        """ Consolidates sequenced feature data into a dictionary of (X, lengths) tuples keyed by the index
+        of each item in the test word list
 
         :param asl: ASLdata object
-        :param fn: str
-            filename of csv file containing word training data
-        :param feature_method: Feature function
+        :param feature_list: list of str
         :return: dict
         """
-        dict = {}
-        # for each word indexed in the DataFrame
-        for i in range(len(self.df)):
-            video = self.df.ix[i,'video']
-            new_sequence = [] # list of sample dictionaries for a sequence
-            for frame in range(self.df.ix[i,'startframe'], self.df.ix[i,'endframe']+1):
-                vid_frame = video, frame
-                sample = [asl.df.ix[vid_frame][f] for f in feature_list]
-                if len(sample) > 0:  # dont add if not found
-                    new_sequence.append(sample)
-            if i in dict:
-                dict[i].append(new_sequence) # list of sequences
-            else:
-                dict[i] = [new_sequence]
-        return dict
+        return asl.get_Xlengths(self.csvfile, self.df, feature_list, list(range(len(self.df))))
 
     def _load_sentence_word_indices(self):
         """ create dict of video sentence numbers with list of word indices as values
@@ -216,7 +232,7 @@ class SinglesData(object):
         working_df = self.df.copy()
         working_df['idx'] = working_df.index
         working_df.sort_values(by='startframe', inplace=True)
-        p = working_df.pivot('video', 'startframe', 'idx')
+        p = working_df.pivot(index='video', columns='startframe', values='idx')
         p.fillna(-1, inplace=True)
         p = p.transpose()
         dict = {}
@@ -232,6 +248,8 @@ class SinglesData(object):
                 {3: [[[87, 225], [87, 225], ...], [[88, 219], [88, 219], ...]]],
                 ...}
         """
+        if self._data is None:
+            self._data = create_sequences(self._hmm_data)
         return self._data
 
     def get_all_Xlengths(self):
@@ -253,7 +271,7 @@ class SinglesData(object):
             lists of feature list sequence lists for given word
                 [[[87, 225], [87, 225], ...]]]
         """
-        return self._data[item]
+        return self.get_all_sequences()[item]
 
     def get_item_Xlengths(self, item:int):
         """ getter for single item (X, lengths) tuple for use with hmmlearn library
@@ -267,6 +285,164 @@ class SinglesData(object):
         return self._hmm_data[item]
 
 
+def load_Xlengths(asl, segments, feature_list, keys):
+    '''
+    gathers the frames of many (video, startframe..endframe) segments with one vectorized lookup
+    into AslDb.df and returns them as (X, lengths) tuples for hmmlearn
+
+    segments sharing a key are concatenated in row order, as create_hmmlearn_data would; frames
+    missing from AslDb.df are skipped
+
+    :param asl: AslDb object
+    :param segments: pandas DataFrame with video, startframe and endframe columns, one row per sequence
+    :param feature_list: list of str feature labels
+    :param keys: list of dictionary keys, one per row of segments
+    :return: dict
+        dictionary of (X, lengths) tuples in order of first appearance of each key
+    '''
+    first_seen = {}
+    for key in keys:
+        first_seen.setdefault(key, len(first_seen))
+    order = np.argsort([first_seen[key] for key in keys], kind='mergesort')
+    starts = segments['startframe'].values[order]
+    counts = segments['endframe'].values[order] - starts + 1
+    frame_offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    frames = np.repeat(starts, counts) + np.arange(counts.sum()) - frame_offsets
+    videos = np.repeat(segments['video'].values[order], counts)
+    positions = asl.df.index.get_indexer(pd.MultiIndex.from_arrays([videos, frames]))
+    found = positions >= 0
+    X_all = asl.df[feature_list].values[positions[found]]
+    seq_lengths = np.bincount(np.repeat(np.arange(len(order)), counts)[found], minlength=len(order))
+    seq_key_ids = np.array([first_seen[keys[i]] for i in order], dtype=int)
+    key_lengths = np.bincount(seq_key_ids, weights=seq_lengths, minlength=len(first_seen)).astype(int)
+    key_seqs = np.bincount(seq_key_ids, minlength=len(first_seen))
+    seq_dict = {}
+    frame_start = seq_start = 0
+    for key, key_id in first_seen.items():
+        frame_end, seq_end = frame_start + key_lengths[key_id], seq_start + key_seqs[key_id]
+        seq_dict[key] = X_all[frame_start:frame_end], [int(n) for n in seq_lengths[seq_start:seq_end]]
+        frame_start, seq_start = frame_end, seq_end
+    return seq_dict
+
+
+def create_sequences(Xlengths):
+    '''
+    splits (X, lengths) tuples back into lists of feature list sequence lists
+
+    :param Xlengths: dict of (X, lengths) tuples
+    :return: dict of lists of sequences
+    '''
+    seq_dict = {}
+    for key, (X, lengths) in Xlengths.items():
+        bounds = np.cumsum([0] + lengths)
+        seq_dict[key] = [X[start:end].tolist() for start, end in zip(bounds[:-1], bounds[1:])]
+    return seq_dict
+
+
+def file_hash(fn):
+    '''
+    sha1 hex digest of a file's contents
+    '''
+    digest = hashlib.sha1()
+    with open(fn, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_strings(strings):
+    '''
+    sha1 hex digest of a list of strings, used as cache key
+    '''
+    return hashlib.sha1('\0'.join(strings).encode('utf-8')).hexdigest()
+
+
+def _publish_cache(target_dir, write):
+    '''
+    writes a cache entry into a temporary directory with write(tmp_dir) and renames it into place,
+    so that concurrent readers never see a partial entry
+    '''
+    parent = os.path.dirname(target_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent)
+    write(tmp_dir)
+    try:
+        os.rename(tmp_dir, target_dir)
+    except OSError:  # another process published the same entry first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def save_frame_cache(frames_dir, df):
+    '''
+    stores the AslDb frame table as one .npy file per column plus the index levels
+    '''
+    def write(tmp_dir):
+        columns = list(df.index.names) + list(df.columns)
+        for i, col in enumerate(columns):
+            values = np.asarray(df.index.get_level_values(col) if i < df.index.nlevels else df[col])
+            if values.dtype.kind not in 'biufc':
+                values = values.astype(str)
+            np.save(os.path.join(tmp_dir, '{}.npy'.format(i)), values)
+        with open(os.path.join(tmp_dir, 'columns.json'), 'w') as f:
+            json.dump({'columns': columns, 'index': list(df.index.names)}, f)
+    _publish_cache(frames_dir, write)
+
+
+def load_frame_cache(frames_dir):
+    '''
+    rebuilds the AslDb frame table saved by save_frame_cache, or returns None if it is not cached
+    '''
+    manifest = os.path.join(frames_dir, 'columns.json')
+    if not os.path.exists(manifest):
+        return None
+    with open(manifest) as f:
+        layout = json.load(f)
+    df = pd.DataFrame({col: np.load(os.path.join(frames_dir, '{}.npy'.format(i)))
+                       for i, col in enumerate(layout['columns'])}, columns=layout['columns'])
+    for col in df.columns:
+        if df[col].dtype.kind == 'U':
+            df[col] = df[col].astype(object)
+    df.set_index(layout['index'], inplace=True)
+    return df
+
+
+def save_Xlengths_cache(xlengths_dir, seq_dict):
+    '''
+    stores (X, lengths) tuples as one concatenated X.npy, a lengths.npy and the keys with their
+    sequence counts
+    '''
+    def write(tmp_dir):
+        keys = list(seq_dict.keys())
+        np.save(os.path.join(tmp_dir, 'X.npy'), np.concatenate([seq_dict[key][0] for key in keys]))
+        np.save(os.path.join(tmp_dir, 'lengths.npy'),
+                np.array([n for key in keys for n in seq_dict[key][1]], dtype=np.int64))
+        with open(os.path.join(tmp_dir, 'keys.json'), 'w') as f:
+            json.dump({'keys': keys, 'counts': [len(seq_dict[key][1]) for key in keys]}, f)
+    _publish_cache(xlengths_dir, write)
+
+
+def load_Xlengths_cache(xlengths_dir):
+    '''
+    loads (X, lengths) tuples saved by save_Xlengths_cache, or returns None if they are not cached;
+    each X is a slice of the memory-mapped X.npy file
+    '''
+    keys_fn = os.path.join(xlengths_dir, 'keys.json')
+    if not os.path.exists(keys_fn):
+        return None
+    with open(keys_fn) as f:
+        layout = json.load(f)
+    X_all = np.load(os.path.join(xlengths_dir, 'X.npy'), mmap_mode='r')
+    all_lengths = np.load(os.path.join(xlengths_dir, 'lengths.npy')).tolist()
+    seq_dict = {}
+    frame_start = seq_start = 0
+    for key, count in zip(layout['keys'], layout['counts']):
+        lengths = all_lengths[seq_start:seq_start + count]
+        frame_end = frame_start + sum(lengths)
+        seq_dict[key] = X_all[frame_start:frame_end], lengths
+        frame_start, seq_start = frame_end, seq_start + count
+    return seq_dict
+
+
 def combine_sequences(sequences):
     '''
     concatenates sequences and return tuple of the new list and lengths
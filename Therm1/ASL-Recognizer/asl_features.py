@@ -0,0 +1,144 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from asl_data import AslDb
+
+FEATURE_SETS = {
+    'ground': ['grnd-rx', 'grnd-ry', 'grnd-lx', 'grnd-ly'],
+    'norm': ['norm-rx', 'norm-ry', 'norm-lx', 'norm-ly'],
+    'polar': ['polar-rr', 'polar-rtheta', 'polar-lr', 'polar-ltheta'],
+    'delta': ['delta-rx', 'delta-ry', 'delta-lx', 'delta-ly'],
+    'rescaled': ['resc-rx', 'resc-ry', 'resc-lx', 'resc-ly'],
+}
+
+# column name -> (input column names, function of the pipeline and the input arrays)
+COLUMNS = {}
+
+
+def define_column(name: str, inputs: list, compute):
+    """ register a derived column
+
+    :param name: str column name in AslDb.df
+    :param inputs: list of str names of the columns it is computed from, raw or derived
+    :param compute: function(pipeline, *input arrays) returning an array with one value per frame
+    """
+    COLUMNS[name] = (list(inputs), compute)
+
+
+for _hand, _h in (('right', 'r'), ('left', 'l')):
+    for _axis in ('x', 'y'):
+        _raw, _suffix = '{}-{}'.format(_hand, _axis), _h + _axis
+        define_column('grnd-' + _suffix, [_raw, 'nose-' + _axis], lambda p, hand, nose: hand - nose)
+        define_column('mean-' + _suffix, [_raw], lambda p, values: p.per_speaker(values, 'mean'))
+        define_column('std-' + _suffix, [_raw], lambda p, values: p.per_speaker(values, 'std'))
+        define_column('min-' + _suffix, [_raw], lambda p, values: p.per_speaker(values, 'min'))
+        define_column('max-' + _suffix, [_raw], lambda p, values: p.per_speaker(values, 'max'))
+        define_column('norm-' + _suffix, [_raw, 'mean-' + _suffix, 'std-' + _suffix],
+                      lambda p, values, mean, std: (values - mean) / std)
+        define_column('resc-' + _suffix, [_raw, 'min-' + _suffix, 'max-' + _suffix],
+                      lambda p, values, low, high: (values - low) / (high - low))
+        define_column('delta-' + _suffix, [_raw], lambda p, values: p.per_video_delta(values))
+    define_column('polar-{}r'.format(_h), ['grnd-{}x'.format(_h), 'grnd-{}y'.format(_h)],
+                  lambda p, x, y: np.hypot(x, y))
+    # angle measured from the vertical axis, hence arctan2(x, y)
+    define_column('polar-{}theta'.format(_h), ['grnd-{}x'.format(_h), 'grnd-{}y'.format(_h)],
+                  lambda p, x, y: np.arctan2(x, y))
+
+
+class FeaturePipeline(object):
+    """ derived ASL features computed on demand from the registered column definitions
+
+    Columns are computed with NumPy over all frames at once, added to asl.df and remembered, so
+    that feature sets sharing a stage (e.g. the grounded coordinates behind the polar ones) compute
+    it once.  Columns already in asl.df, raw or added by hand, are used as they are.  Training and
+    test datasets are also remembered per feature list.
+    """
+
+    def __init__(self, asl: AslDb):
+        self.asl = asl
+        self.speaker_codes, _ = pd.factorize(asl.df['speaker'])
+        self.num_speakers = self.speaker_codes.max() + 1
+        videos = asl.df.index.get_level_values('video').values
+        # frames whose previous row belongs to the same video
+        self.continues_video = np.concatenate(([False], videos[1:] == videos[:-1]))
+        self.columns = {}
+        self.datasets = {}
+        self.computed = []
+
+    def column(self, name: str) -> np.ndarray:
+        """ values of a column for every frame, computing it and its inputs if needed
+
+        :param name: str column name
+        :return: numpy array
+        """
+        if name not in self.columns:
+            if name in self.asl.df.columns:
+                self.columns[name] = self.asl.df[name].values
+            elif name in COLUMNS:
+                inputs, compute = COLUMNS[name]
+                self.columns[name] = compute(self, *[self.column(i) for i in inputs])
+                self.asl.df[name] = self.columns[name]
+                self.computed.append(name)
+            else:
+                raise KeyError("no data or definition for feature column {}".format(name))
+        return self.columns[name]
+
+    def features(self, feature_list) -> list:
+        """ make sure every column of a feature list, or of a FEATURE_SETS name, is in asl.df
+
+        :return: list of str column names
+        """
+        if isinstance(feature_list, str):
+            feature_list = FEATURE_SETS[feature_list]
+        for name in feature_list:
+            self.column(name)
+        return list(feature_list)
+
+    def build_training(self, feature_list, csvfilename=os.path.join('data', 'train_words.csv')):
+        """ WordsData for a feature list or FEATURE_SETS name, see AslDb.build_training """
+        features = self.features(feature_list)
+        key = ('training', tuple(features), csvfilename)
+        if key not in self.datasets:
+            self.datasets[key] = self.asl.build_training(features, csvfilename)
+        return self.datasets[key]
+
+    def build_test(self, feature_list, csvfile=os.path.join('data', 'test_words.csv')):
+        """ SinglesData for a feature list or FEATURE_SETS name, see AslDb.build_test """
+        features = self.features(feature_list)
+        key = ('test', tuple(features), csvfile)
+        if key not in self.datasets:
+            self.datasets[key] = self.asl.build_test(features, csvfile)
+        return self.datasets[key]
+
+    def per_speaker(self, values: np.ndarray, statistic: str) -> np.ndarray:
+        """ a statistic of values over each speaker's frames, repeated for every frame
+
+        :param statistic: 'mean', 'std' (with one degree of freedom, as pandas), 'min' or 'max'
+        """
+        codes = self.speaker_codes
+        values = values.astype(float)
+        counts = np.bincount(codes, minlength=self.num_speakers)
+        if statistic in ('mean', 'std'):
+            means = np.bincount(codes, values, self.num_speakers) / counts
+            if statistic == 'mean':
+                return means[codes]
+            squares = np.bincount(codes, (values - means[codes]) ** 2, self.num_speakers)
+            return np.sqrt(squares / (counts - 1))[codes]
+        if statistic == 'min':
+            result = np.full(self.num_speakers, np.inf)
+            np.minimum.at(result, codes, values)
+        elif statistic == 'max':
+            result = np.full(self.num_speakers, -np.inf)
+            np.maximum.at(result, codes, values)
+        else:
+            raise ValueError("unknown statistic {}".format(statistic))
+        return result[codes]
+
+    def per_video_delta(self, values: np.ndarray) -> np.ndarray:
+        """ difference with the previous frame of the same video, 0 for the first frame of each video """
+        delta = np.zeros(len(values), dtype=np.result_type(values, float))
+        delta[1:] = values[1:] - values[:-1]
+        delta[~self.continues_video] = 0
+        return delta
@@ -0,0 +1,79 @@
+import math
+import os
+from collections import Counter
+
+import pandas as pd
+
+SENTENCE_START = '<s>'
+SENTENCE_END = '</s>'
+
+
+def load_sentences(csvfile=os.path.join('data', 'train_words.csv')):
+    """ word sentences of each video in a word segment csv file, in signing order
+
+    :param csvfile: str
+        filename of csv file with expected format:
+            video,speaker,word,startframe,endframe
+    :return: list of lists of str
+    """
+    df = pd.read_csv(csvfile).sort_values(['video', 'startframe'], kind='stable')
+    return [list(words) for _, words in df.groupby('video', sort=True)['word']]
+
+
+class NgramLanguageModel(object):
+    """ word n-gram model with interpolated absolute discounting
+
+    P(w | h) = max(c(h, w) - D, 0) / c(h) + D * N1+(h) / c(h) * P(w | h shortened by one word)
+
+    down to a unigram model interpolated with a uniform distribution over the vocabulary plus one
+    unknown word, so that every word gets a non-zero probability.  Lookups are memoized, since
+    decoding asks for the same (history, word) pairs over and over.
+    """
+
+    def __init__(self, sentences: list, n=2, discount=0.75):
+        """
+        :param sentences: list of lists of str training sentences
+        :param n: int order of the model, 1 for unigrams
+        :param discount: float absolute discount D, between 0 and 1
+        """
+        self.n = n
+        self.discount = discount
+        self.vocabulary = {word for sentence in sentences for word in sentence} | {SENTENCE_END}
+        # counts[k] maps k-word histories to a Counter of the words that follow them
+        self.counts = [{} for _ in range(n)]
+        for sentence in sentences:
+            padded = [SENTENCE_START] * (n - 1) + list(sentence) + [SENTENCE_END]
+            for i in range(n - 1, len(padded)):
+                for k in range(n):
+                    history = tuple(padded[i - k:i])
+                    self.counts[k].setdefault(history, Counter())[padded[i]] += 1
+        self.totals = [{history: sum(c.values()) for history, c in counts.items()} for counts in self.counts]
+        self._cache = {}
+
+    def start(self) -> tuple:
+        """ history at the start of a sentence """
+        return (SENTENCE_START,) * (self.n - 1)
+
+    def log_prob(self, history: tuple, word: str) -> float:
+        """ natural log probability of a word following a history
+
+        :param history: tuple of the preceding words; only the last n - 1 are used
+        :param word: str, or SENTENCE_END
+        :return: float
+        """
+        history = tuple(history[len(history) - self.n + 1:]) if self.n > 1 else ()
+        key = (history, word)
+        if key not in self._cache:
+            self._cache[key] = math.log(self.prob(history, word))
+        return self._cache[key]
+
+    def prob(self, history: tuple, word: str) -> float:
+        p = 1.0 / (len(self.vocabulary) + 1)
+        for k in range(len(history) + 1):
+            context = history[len(history) - k:]
+            following = self.counts[k].get(context)
+            if following is None:
+                break
+            total = self.totals[k][context]
+            p = (max(following[word] - self.discount, 0) + self.discount * len(following) * p) / total
+        return p
@@ -0,0 +1,112 @@
+"""
+Log space scoring of GaussianHMM models, shared by the model selectors and the recognizers
+"""
+import numpy as np
+
+
+class SequenceBatch(object):
+    ''' test items stacked into one array so that each model scores all of them in a single
+    vectorized forward pass
+
+    The sequences are ordered longest first: at every time step the sequences still running are
+    then a prefix of the batch, and the forward variables of all of them are updated together.
+    '''
+
+    def __init__(self, items: list):
+        """
+        :param items: list of (X, lengths) tuples, as from SinglesData.get_all_Xlengths
+        """
+        self.num_items = len(items)
+        self.X = np.concatenate([np.asarray(X, dtype=float) for X, _ in items]) if items else np.zeros((0, 0))
+        lengths = np.array([n for _, item_lengths in items for n in item_lengths], dtype=int)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(int)
+        # first sequence of each item, used to add up per-sequence scores into item scores
+        self.item_starts = np.cumsum([0] + [len(item_lengths) for _, item_lengths in items[:-1]])
+        self.order = np.argsort(-lengths, kind='stable')
+        self.lengths = lengths[self.order]
+        self.starts = starts[self.order]
+        max_length = self.lengths[0] if len(lengths) else 0
+        self.num_active = (self.lengths[None, :] > np.arange(max_length)[:, None]).sum(axis=1)
+
+    def emission_log_prob(self, model):
+        """ log density of every frame under every state of a diagonal covariance GaussianHMM
+
+        :return: array of shape (frames, states)
+        """
+        covars = np.asarray(model.covars_)
+        variances = np.diagonal(covars, axis1=1, axis2=2) if covars.ndim == 3 else covars
+        # same floor as hmmlearn, so that collapsed states score like they do in model.score
+        variances = np.maximum(variances, np.finfo(float).tiny)
+        with np.errstate(over='ignore'):
+            return -0.5 * (self.X.shape[1] * np.log(2 * np.pi) + np.log(variances).sum(axis=1)
+                           + ((self.X[:, None, :] - model.means_) ** 2 / variances).sum(axis=2))
+
+    def forward(self, model):
+        """ log likelihood of each sequence, in batch order, from a log space forward pass
+
+        :return: array with one log likelihood per sequence
+        """
+        log_b = self.emission_log_prob(model)
+        with np.errstate(divide='ignore'):
+            log_transmat = np.log(model.transmat_)
+            log_alpha = np.log(model.startprob_)[None, :] + log_b[self.starts]
+        log_likelihood = np.empty(len(self.lengths))
+        for t, n in enumerate(self.num_active):
+            if t:
+                # log-sum-exp over the previous state, for all running sequences at once
+                terms = log_alpha[:n, :, None] + log_transmat
+                peak = terms.max(axis=1)
+                peak[~np.isfinite(peak)] = 0.0
+                with np.errstate(divide='ignore'):
+                    log_alpha = (np.log(np.exp(terms - peak[:, None, :]).sum(axis=1)) + peak
+                                 + log_b[self.starts[:n] + t])
+            ending = self.lengths[:n] == t + 1
+            if ending.any():
+                log_likelihood[:n][ending] = logsumexp(log_alpha[ending])
+        return log_likelihood
+
+    def score(self, model):
+        """ log likelihood of each test item under a model, -inf where it cannot be scored
+
+        :param model: GaussianHMM object or None
+        :return: array with one log likelihood per item
+        """
+        if model is None or not self.num_items or not self.is_valid(model):
+            return np.full(self.num_items, float('-inf'))
+        if model.covariance_type != 'diag':
+            return self.score_each(model)
+        sequence_scores = np.empty(len(self.lengths))
+        sequence_scores[self.order] = self.forward(model)
+        return np.add.reduceat(sequence_scores, self.item_starts)
+
+    @staticmethod
+    def is_valid(model):
+        """ False for models that model.score refuses, whose probabilities do not sum to one """
+        return (np.allclose(model.startprob_.sum(), 1.0) and
+                np.allclose(model.transmat_.sum(axis=1), 1.0))
+
+    def score_each(self, model):
+        """ per item model.score, for models the batched forward pass does not handle """
+        scores = np.full(self.num_items, float('-inf'))
+        bounds = np.concatenate((self.item_starts, [len(self.lengths)]))
+        sequence_starts = np.empty(len(self.lengths), dtype=int)
+        sequence_starts[self.order] = self.starts
+        sequence_lengths = np.empty(len(self.lengths), dtype=int)
+        sequence_lengths[self.order] = self.lengths
+        for item in range(self.num_items):
+            first, last = bounds[item], bounds[item + 1]
+            start = sequence_starts[first]
+            lengths = sequence_lengths[first:last].tolist()
+            try:
+                scores[item] = model.score(self.X[start:start + sum(lengths)], lengths)
+            except Exception:
+                pass
+        return scores
+
+
+def logsumexp(a):
+    """ log of the sum of exp(a) along the last axis, -inf for rows that are all -inf """
+    peak = a.max(axis=-1)
+    peak[~np.isfinite(peak)] = 0.0
+    with np.errstate(divide='ignore'):
+        return np.log(np.exp(a - peak[..., None]).sum(axis=-1)) + peak
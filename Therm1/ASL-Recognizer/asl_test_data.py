@@ -0,0 +1,54 @@
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from asl_data import AslDb
+
+FEATURES = ['right-y', 'right-x']
+
+
+class TestLoadData(TestCase):
+    def setUp(self):
+        self.asl = AslDb()
+        self.training = self.asl.build_training(FEATURES)
+
+    def frame_by_frame(self, video, start, end):
+        return [[self.asl.df.loc[(video, frame), f] for f in FEATURES] for frame in range(start, end + 1)]
+
+    def test_Xlengths_match_frame_lookup(self):
+        X, lengths = self.training.get_word_Xlengths('FRANK')
+        expected = self.frame_by_frame(97, 7, 24) + self.frame_by_frame(98, 22, 35)
+        self.assertEqual(lengths[:2], [18, 14])
+        self.assertTrue(np.array_equal(X[:32], np.array(expected)))
+
+    def test_sequences_match_Xlengths(self):
+        X, lengths = self.training.get_word_Xlengths('BOOK')
+        sequences = self.training.get_word_sequences('BOOK')
+        self.assertEqual([len(s) for s in sequences], lengths)
+        self.assertEqual([sample for s in sequences for sample in s], X.tolist())
+
+
+class TestDataCache(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+    def test_cached_Xlengths_match_uncached(self):
+        expected = AslDb().build_training(FEATURES).get_all_Xlengths()
+        for _ in range(2):  # first pass fills the cache, second reads it back
+            asl = AslDb(cache_dir=self.cache_dir)
+            cached = asl.build_training(FEATURES).get_all_Xlengths()
+            self.assertEqual(list(cached), list(expected))
+            for word, (X, lengths) in expected.items():
+                self.assertTrue(np.array_equal(cached[word][0], X))
+                self.assertEqual(cached[word][1], lengths)
+
+    def test_feature_change_invalidates_cache(self):
+        asl = AslDb(cache_dir=self.cache_dir)
+        asl.df['derived'] = asl.df['right-y']
+        before, _ = asl.build_training(['derived']).get_word_Xlengths('FRANK')
+        asl.df['derived'] = asl.df['right-x']
+        after, _ = asl.build_training(['derived']).get_word_Xlengths('FRANK')
+        self.assertFalse(np.array_equal(before, after))
@@ -0,0 +1,36 @@
+from unittest import TestCase
+
+import numpy as np
+
+from asl_data import AslDb
+from asl_features import FEATURE_SETS, FeaturePipeline
+
+
+class TestFeaturePipeline(TestCase):
+    def setUp(self):
+        self.asl = AslDb()
+        self.pipeline = FeaturePipeline(self.asl)
+
+    def sample(self, feature_set, frame):
+        return self.asl.df.loc[(98, frame), self.pipeline.features(feature_set)].astype(float).tolist()
+
+    def test_features_ground(self):
+        self.assertEqual(self.sample('ground', 1), [9, 113, -12, 119])
+
+    def test_features_norm(self):
+        np.testing.assert_almost_equal(self.sample('norm', 1), [1.153, 1.663, -0.891, 0.742], 3)
+
+    def test_features_polar(self):
+        np.testing.assert_almost_equal(self.sample('polar', 1), [113.3578, 0.0794, 119.603, -0.1005], 3)
+
+    def test_features_delta(self):
+        self.assertEqual(self.sample('delta', 0), [0, 0, 0, 0])
+        self.assertEqual(self.sample('delta', 18), [-14, -9, 0, 0])
+
+    def test_shared_stages_computed_once(self):
+        self.pipeline.features('ground')
+        computed = len(self.pipeline.computed)
+        self.pipeline.features('polar')
+        self.assertEqual(self.pipeline.computed[computed:], FEATURE_SETS['polar'])
+        training = self.pipeline.build_training('polar')
+        self.assertIs(self.pipeline.build_training(FEATURE_SETS['polar']), training)
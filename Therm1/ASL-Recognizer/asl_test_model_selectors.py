@@ -1,8 +1,13 @@
+import shutil
+import tempfile
 from unittest import TestCase
 
+import numpy as np
+
 from asl_data import AslDb
+from asl_utils import train_all_words
 from my_model_selectors import (
-    SelectorConstant, SelectorBIC, SelectorDIC, SelectorCV,
+    DICEngine, ModelFitCache, SelectorConstant, grown_parameters, SelectorBIC, SelectorDIC, SelectorCV,
 )
 
 FEATURES = ['right-y', 'right-x']
@@ -37,3 +42,108 @@ class TestSelectors(TestCase):
         self.assertGreaterEqual(model.n_components, 2)
         model = SelectorDIC(self.sequences, self.xlengths, 'TOY').select()
         self.assertGreaterEqual(model.n_components, 2)
+
+
+class TestAdaptiveSelection(TestCase):
+    def setUp(self):
+        asl = AslDb()
+        self.training = asl.build_training(FEATURES)
+        self.sequences = self.training.get_all_sequences()
+        self.xlengths = self.training.get_all_Xlengths()
+
+    def test_adaptive_bic_and_cv(self):
+        for selector in (SelectorBIC, SelectorCV):
+            model = selector(self.sequences, self.xlengths, 'CHICKEN', adaptive=True).select()
+            self.assertGreaterEqual(model.n_components, 2)
+            self.assertEqual(model.n_iter, 1000, "the selected model should be refitted in full")
+
+    def test_early_stopping(self):
+        scores = {2: 1.0, 3: 2.0, 4: 1.5, 5: 1.0, 6: 9.0}
+        selector = SelectorBIC(self.sequences, self.xlengths, 'BOOK', max_n_components=6, adaptive=True)
+        self.assertEqual(selector.best_num_components(scores.get), 3)
+        selector.adaptive = False
+        self.assertEqual(selector.best_num_components(scores.get), 6)
+
+    def test_grown_parameters(self):
+        model = SelectorConstant(self.sequences, self.xlengths, 'BOOK').select()
+        startprob, transmat, means, covars = grown_parameters(model, model.n_components + 2)
+        self.assertEqual(means.shape, (model.n_components + 2, len(FEATURES)))
+        self.assertEqual(covars.shape, means.shape)
+        self.assertAlmostEqual(startprob.sum(), 1.0)
+        self.assertTrue(np.allclose(transmat.sum(axis=1), 1.0))
+
+
+class TestModelFitCache(TestCase):
+    def setUp(self):
+        self.training = AslDb().build_training(FEATURES)
+        self.sequences = self.training.get_all_sequences()
+        self.xlengths = self.training.get_all_Xlengths()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+    def test_selectors_share_fits(self):
+        cache = ModelFitCache()
+        model = SelectorConstant(self.sequences, self.xlengths, 'BOOK', fit_cache=cache).select()
+        again = SelectorConstant(self.sequences, self.xlengths, 'BOOK', fit_cache=cache).select()
+        self.assertIs(again, model)
+        self.assertEqual((cache.misses, cache.hits), (1, 1))
+        other = SelectorConstant(self.sequences, self.xlengths, 'BOOK', n_constant=4, fit_cache=cache).select()
+        self.assertEqual(other.n_components, 4)
+        self.assertEqual(cache.misses, 2)
+
+    def test_no_cache_by_default(self):
+        model = SelectorConstant(self.sequences, self.xlengths, 'BOOK').select()
+        again = SelectorConstant(self.sequences, self.xlengths, 'BOOK').select()
+        self.assertIsNot(again, model)
+        self.assertTrue(np.array_equal(again.means_, model.means_))
+
+    def test_least_recently_used_dropped(self):
+        cache = ModelFitCache(max_models=1)
+        SelectorConstant(self.sequences, self.xlengths, 'BOOK', fit_cache=cache).select()
+        SelectorConstant(self.sequences, self.xlengths, 'BOOK', n_constant=4, fit_cache=cache).select()
+        self.assertEqual(len(cache.models), 1)
+        SelectorConstant(self.sequences, self.xlengths, 'BOOK', fit_cache=cache).select()
+        self.assertEqual((cache.misses, cache.hits), (3, 0))
+
+    def test_fits_persist_to_disk(self):
+        model = SelectorConstant(self.sequences, self.xlengths, 'BOOK',
+                                 fit_cache=ModelFitCache(self.cache_dir)).select()
+        cache = ModelFitCache(self.cache_dir)
+        loaded = SelectorConstant(self.sequences, self.xlengths, 'BOOK', fit_cache=cache).select()
+        self.assertEqual((cache.misses, cache.hits), (0, 1))
+        self.assertTrue(np.array_equal(loaded.means_, model.means_))
+
+
+class TestDICEngine(TestCase):
+    def setUp(self):
+        self.training = AslDb().build_training(FEATURES)
+        self.xlengths = self.training.get_all_Xlengths()
+        self.engine = DICEngine(self.xlengths, max_n_components=4)
+
+    def test_dic_matches_model_score(self):
+        scores = self.engine.dic('MARY')
+        for i, model in enumerate(self.engine.models['MARY']):
+            others = [model.score(X, lengths) for word, (X, lengths) in self.xlengths.items() if word != 'MARY']
+            self.assertAlmostEqual(scores[i], model.score(*self.xlengths['MARY']) - np.mean(others), places=4)
+        self.assertIs(self.engine.select('MARY'), self.engine.models['MARY'][int(np.argmax(scores))])
+
+    def test_selector_uses_given_engine(self):
+        sequences = self.training.get_all_sequences()
+        model = SelectorDIC(sequences, self.xlengths, 'MARY', dic_engine=self.engine).select()
+        self.assertIs(model, self.engine.select('MARY'))
+
+    def test_full_matrix_shape(self):
+        matrix = self.engine.compute()
+        self.assertEqual(matrix.shape, (3 * len(self.engine.words), len(self.engine.words)))
+
+
+class TestTrainAllWords(TestCase):
+    def setUp(self):
+        self.training = AslDb().build_training(FEATURES)
+
+    def test_parallel_training_matches_serial(self):
+        serial = train_all_words(self.training, SelectorConstant)
+        parallel = train_all_words(self.training, SelectorConstant, n_jobs=2)
+        self.assertEqual(list(parallel), list(serial))
+        for word, model in serial.items():
+            self.assertTrue(np.array_equal(parallel[word].means_, model.means_), word)
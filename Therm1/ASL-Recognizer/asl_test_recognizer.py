@@ -1,9 +1,15 @@
+import math
 from unittest import TestCase
 
+import numpy as np
+
 from asl_data import AslDb
+from asl_language_model import NgramLanguageModel, load_sentences
 from asl_utils import train_all_words
 from my_model_selectors import SelectorConstant
-from my_recognizer import recognize
+from my_recognizer import (
+    StreamingRecognizer, read_frames, recognize, recognize_sentences, recognize_stream,
+)
 
 FEATURES = ['right-y', 'right-x']
 
@@ -30,3 +36,92 @@ class TestRecognize(TestCase):
         self.assertIsInstance(guesses[0], str, "The guesses are not strings")
         self.assertIsInstance(guesses[-1], str, "The guesses are not strings")
 
+
+    def test_recognize_matches_model_score(self):
+        probs, guesses = recognize(self.models, self.test_set)
+        for item in (0, 1, self.test_set.num_items - 1):
+            X, lengths = self.test_set.get_item_Xlengths(item)
+            for word in ('FRANK', 'CHICKEN', guesses[item]):
+                self.assertAlmostEqual(probs[item][word], self.models[word].score(X, lengths), places=4)
+            self.assertEqual(guesses[item], max(probs[item], key=probs[item].get))
+
+    def test_recognize_sentences_interface(self):
+        lm = NgramLanguageModel(load_sentences(), n=2)
+        probs, guesses = recognize_sentences(self.models, self.test_set, lm, beam_width=5)
+        self.assertEqual(probs, recognize(self.models, self.test_set)[0])
+        self.assertEqual(len(guesses), self.test_set.num_items, "Number of test items in guesses list incorrect.")
+        self.assertIsInstance(guesses[0], str, "The guesses are not strings")
+
+    def test_language_model_is_normalized(self):
+        lm = NgramLanguageModel(load_sentences(), n=3)
+        for history in (lm.start(), ('JOHN', 'WRITE'), ('NOT', 'A-WORD')):
+            total = sum(math.exp(lm.log_prob(history, word)) for word in lm.vocabulary)
+            self.assertLess(total, 1.0)
+            self.assertAlmostEqual(total + math.exp(lm.log_prob(history, 'A-WORD')), 1.0)
+
+    def stream_segments(self):
+        """ test items in the order of the frame stream, as (item, (video, startframe, endframe)) """
+        videos = {}
+        for video, _, _ in read_frames(feature_list=FEATURES):
+            videos.setdefault(video, len(videos))
+        df = self.test_set.df
+        items = sorted(range(len(df)), key=lambda i: (videos[df['video'][i]], df['startframe'][i]))
+        return [(i, (int(df['video'][i]), int(df['startframe'][i]), int(df['endframe'][i]))) for i in items]
+
+    def test_recognize_stream_matches_recognize(self):
+        probs, guesses = recognize(self.models, self.test_set)
+        items, segments = zip(*self.stream_segments())
+        final = {}
+        for i, _, word, logL in recognize_stream(StreamingRecognizer(self.models),
+                                                 read_frames(feature_list=FEATURES), segments):
+            final[items[i]] = word, logL
+        self.assertEqual(len(final), self.test_set.num_items)
+        for item, (word, logL) in final.items():
+            self.assertEqual(word, guesses[item])
+            self.assertAlmostEqual(logL, probs[item][word], places=4)
+
+    def test_recognize_stream_reads_segments_lazily(self):
+        read = []
+
+        def segments():
+            for _, segment in self.stream_segments():
+                read.append(segment)
+                yield segment
+
+        stream = recognize_stream(StreamingRecognizer(self.models), read_frames(feature_list=FEATURES), segments())
+        next(stream)
+        self.assertLessEqual(len(read), 2)
+
+    def test_recognize_stream_missing_video(self):
+        videos = []
+        for _, (video, _, _) in self.stream_segments():
+            if video not in videos:
+                videos.append(video)
+        frames = [f for f in read_frames(feature_list=FEATURES) if f[0] in videos[:2]]
+        first = [segment for _, segment in self.stream_segments() if segment[0] == videos[0]]
+        second = [segment for _, segment in self.stream_segments() if segment[0] == videos[1]]
+        missing = max(videos) + 1
+        segments = first + [(missing, 0, 5)] + second
+        seen = set()
+        with self.assertRaisesRegex(ValueError, 'segment {} names video {}'.format(len(first), missing)):
+            for i, _, _, _ in recognize_stream(StreamingRecognizer(self.models), frames, segments):
+                seen.add(i)
+        self.assertEqual(seen, set(range(len(first))))
+        # a late segment of a video the stream has already left is dropped
+        segments = first + second + [first[0]]
+        seen = set(i for i, _, _, _ in recognize_stream(StreamingRecognizer(self.models), frames, segments))
+        self.assertEqual(seen, set(range(len(first) + len(second))))
+
+    def test_recognize_stream_unsegmented(self):
+        recognizer = StreamingRecognizer(self.models)
+        video = self.test_set.df['video'][0]
+        frames = [(v, frame, x) for v, frame, x in read_frames(feature_list=FEATURES) if v == video]
+        for item, _, word, logL in recognize_stream(recognizer, frames):
+            self.assertEqual(item, video)
+        X = np.array([x for _, _, x in frames])
+        self.assertAlmostEqual(logL, self.models[word].score(X, [len(X)]), places=4)
+        for _, _, x in frames[:10]:
+            best = recognizer.update(x)
+            scores = recognizer.scores()
+            self.assertEqual(best, max(scores.items(), key=lambda item: item[1]))
+            self.assertEqual(recognizer.best(3), sorted(scores.items(), key=lambda item: item[1], reverse=True)[:3])
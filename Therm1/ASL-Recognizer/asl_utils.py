@@ -1,3 +1,6 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from timeit import default_timer as timer
+
 from asl_data import SinglesData, WordsData
 import numpy as np
 from IPython.core.display import display, HTML
@@ -42,21 +45,69 @@ def getKey(item):
     return item[1]
 
 
-def train_all_words(training: WordsData, model_selector):
+def train_all_words(training: WordsData, model_selector, n_jobs=1, random_state=14, verbose=False,
+                    **selector_args):
     """ train all words given a training set and selector
 
+    With n_jobs > 1 the words are shared out to a pool of worker processes.  The training
+    sequences are handed to each worker once, when it starts, rather than with every word; with
+    the fork start method (the default on Linux) the workers simply share the parent's arrays.
+    Each word's models are fitted with the same random_state whichever process trains it, so
+    the result does not depend on n_jobs.
+
     :param training: WordsData object (training set)
     :param model_selector: class (subclassed from ModelSelector)
+    :param n_jobs: int number of worker processes, 1 trains serially in this process
+    :param random_state: int seed passed to the selector
+    :param verbose: bool print the training time of each word as it finishes
+    :param selector_args: further keyword arguments for the selector, e.g. max_n_components
     :return: dict of models keyed by word
     """
     sequences = training.get_all_sequences()
     Xlengths = training.get_all_Xlengths()
-    model_dict = {}
-    for word in training.words:
-        model = model_selector(sequences, Xlengths, word,
-                               n_constant=3).select()
-        model_dict[word] = model
-    return model_dict
+    selector_args = dict(selector_args, n_constant=selector_args.get('n_constant', 3),
+                         random_state=random_state)
+    # longest words first, so that a slow word does not start last and hold up the pool
+    words = sorted(training.words, key=lambda w: len(Xlengths[w][0]), reverse=True)
+    start = timer()
+    models = {}
+    if n_jobs == 1:
+        _init_training_worker(model_selector, sequences, Xlengths, selector_args)
+        results = map(_train_word, words)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(n_jobs, initializer=_init_training_worker,
+                                       initargs=(model_selector, sequences, Xlengths, selector_args))
+        results = (future.result() for future in as_completed([executor.submit(_train_word, word)
+                                                               for word in words]))
+    try:
+        for word, model, seconds in results:
+            models[word] = model
+            if verbose:
+                n_states = model.n_components if model is not None else None
+                print("{:>4}/{}  {:<16} {:>7.2f}s  {} states".format(len(models), len(words), word,
+                                                                      seconds, n_states))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    if verbose:
+        print("Trained {} words in {:.2f}s".format(len(models), timer() - start))
+    return {word: models[word] for word in training.words}
+
+
+_training_job = {}
+
+
+def _init_training_worker(model_selector, sequences, Xlengths, selector_args):
+    _training_job.update(model_selector=model_selector, sequences=sequences, Xlengths=Xlengths,
+                         selector_args=selector_args)
+
+
+def _train_word(word):
+    start = timer()
+    model = _training_job['model_selector'](_training_job['sequences'], _training_job['Xlengths'], word,
+                                            **_training_job['selector_args']).select()
+    return word, model, timer() - start
 
 
 def combine_sequences(split_index_list, sequences):
@@ -0,0 +1,64 @@
+import argparse
+import warnings
+from timeit import default_timer as timer
+
+import numpy as np
+
+from asl_data import AslDb
+from asl_utils import train_all_words
+from my_model_selectors import SelectorConstant
+from my_recognizer import recognize
+
+
+def score_pairs(models: dict, test_set):
+    """ reference scoring: one model.score call per (test item, word model) pair
+
+    :return: list of dicts of log likelihoods, ordered by test item
+    """
+    probabilities = []
+    for X, lengths in test_set.get_all_Xlengths().values():
+        logL_dict = {}
+        for word, model in models.items():
+            try:
+                logL_dict[word] = model.score(X, lengths)
+            except Exception:
+                logL_dict[word] = float('-inf')
+        probabilities.append(logL_dict)
+    return probabilities
+
+
+def main(features, n_constant, repeats):
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    asl = AslDb()
+    training = asl.build_training(features)
+    test_set = asl.build_test(features)
+    models = train_all_words(training, SelectorConstant, n_constant=n_constant)
+    print("{} word models with {} states, {} test items, features {}".format(
+        len(models), n_constant, test_set.num_items, features))
+
+    timings = {}
+    for name, function in (("model.score per pair", score_pairs),
+                           ("batched recognize", lambda m, t: recognize(m, t)[0])):
+        start = timer()
+        for _ in range(repeats):
+            probabilities = function(models, test_set)
+        timings[name] = ((timer() - start) / repeats, probabilities)
+
+    for name, (seconds, _) in timings.items():
+        print("{:<22} {:>8.3f}s".format(name, seconds))
+    (pair_seconds, expected), (batch_seconds, actual) = timings.values()
+    difference = max(abs(e[w] - a[w]) for e, a in zip(expected, actual) for w in e if np.isfinite(e[w]))
+    print("speedup {:.1f}x, largest log likelihood difference {:.2e}".format(pair_seconds / batch_seconds,
+                                                                            difference))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-pair and batched log likelihood " +
+        "scoring of the test set against models trained with SelectorConstant.")
+    parser.add_argument('-f', '--features', nargs="+", default=['right-y', 'right-x'],
+                        help="Columns of the hands data to use as features.")
+    parser.add_argument('-n', '--n-constant', type=int, default=3, help="Number of states of each word model.")
+    parser.add_argument('-r', '--repeats', type=int, default=3, help="Number of timed repetitions.")
+    args = parser.parse_args()
+
+    main(args.features, args.n_constant, args.repeats)
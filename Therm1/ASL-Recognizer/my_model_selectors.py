@@ -1,13 +1,109 @@
+import hashlib
 import math
+import os
+import pickle
 import statistics
 import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 from hmmlearn.hmm import GaussianHMM
 from sklearn.model_selection import KFold
+from asl_scoring import SequenceBatch
 from asl_utils import combine_sequences
 
 
+class ModelFitCache(object):
+    '''
+    fitted GaussianHMM models shared by the selectors it is passed to, so that a model for the
+    same word, number of states and data is only trained once whichever of them asks for it
+
+    Entries are keyed by (word, n_components, fold, random_state, hyperparameters, data digest);
+    the digest of the training data keeps models trained on different feature sets apart.
+    At most max_models models are kept in memory, dropping the least recently used ones.
+    With a cache_dir the models are also pickled to disk and reused by later runs.
+    The selectors sharing a cache get the same model objects, which must not be refitted.
+    '''
+
+    def __init__(self, cache_dir=None, max_models=256):
+        self.cache_dir = cache_dir
+        self.max_models = max_models
+        self.models = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def fit(self, word, n_components, X, lengths, fold=None, random_state=14, **hyperparameters):
+        """ fitted model from the cache, training it on a miss
+
+        :param word: str word the model is trained for
+        :param n_components: int number of hidden states
+        :param X: training samples, as for GaussianHMM.fit
+        :param lengths: list of sequence lengths in X
+        :param fold: hashable identifying the subset of the word's sequences in X, None for all of them
+        :param random_state: int seed for GaussianHMM
+        :param hyperparameters: further GaussianHMM arguments
+        :return: GaussianHMM object; fitting errors are raised and not cached
+        """
+        X = np.asarray(X)
+        digest = hashlib.sha1(np.ascontiguousarray(X).tobytes())
+        digest.update(repr((X.shape, list(lengths))).encode('utf-8'))
+        key = (word, n_components, fold, random_state, tuple(sorted(hyperparameters.items())),
+               digest.hexdigest())
+        model = self.models.pop(key, None)
+        if model is None:
+            model = self.load(key)
+        if model is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            model = GaussianHMM(n_components=n_components, random_state=random_state,
+                                **hyperparameters).fit(X, lengths)
+            self.save(key, model)
+        self.models[key] = model
+        while len(self.models) > self.max_models:
+            self.models.popitem(last=False)
+        return model
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, '{}.pkl'.format(hashlib.sha1(repr(key).encode('utf-8')).hexdigest()))
+
+    def load(self, key):
+        if self.cache_dir is None or not os.path.exists(self.path(key)):
+            return None
+        try:
+            with open(self.path(key), 'rb') as f:
+                return pickle.load(f)
+        except (EOFError, pickle.UnpicklingError):
+            return None
+
+    def save(self, key, model):
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        partial = self.path(key) + '.{}.tmp'.format(os.getpid())
+        with open(partial, 'wb') as f:
+            pickle.dump(model, f)
+        os.replace(partial, self.path(key))
+
+    def clear(self):
+        """ empty the in-memory cache; models persisted to cache_dir are kept """
+        self.models.clear()
+
+
+def fit_model(fit_cache, word, n_components, X, lengths, fold=None, random_state=14, **hyperparameters):
+    ''' GaussianHMM for a word trained on X, taken from fit_cache when one is given
+
+    :param fit_cache: ModelFitCache object, or None to train a new model
+    :return: GaussianHMM object, see ModelFitCache.fit for the other parameters
+    '''
+    if fit_cache is None:
+        return GaussianHMM(n_components=n_components, random_state=random_state,
+                           **hyperparameters).fit(X, lengths)
+    return fit_cache.fit(word, n_components, X, lengths, fold=fold, random_state=random_state,
+                         **hyperparameters)
+
+
 class ModelSelector(object):
     '''
     base class for model selection (strategy design pattern)
@@ -16,7 +112,8 @@ class ModelSelector(object):
     def __init__(self, all_word_sequences: dict, all_word_Xlengths: dict, this_word: str,
                  n_constant=3,
                  min_n_components=2, max_n_components=10,
-                 random_state=14, verbose=False):
+                 random_state=14, verbose=False, fit_cache=None,
+                 adaptive=False, patience=2, search_n_iter=100, search_tol=0.5):
         self.words = all_word_sequences
         self.hwords = all_word_Xlengths
         self.sequences = all_word_sequences[this_word]
@@ -27,17 +124,90 @@ class ModelSelector(object):
         self.max_n_components = max_n_components
         self.random_state = random_state
         self.verbose = verbose
+        # ModelFitCache shared with other selectors, None to train every model here
+        self.fit_cache = fit_cache
+        # adaptive mode: early stopping, warm-started and loosely converged candidate fits
+        self.adaptive = adaptive
+        self.patience = patience
+        self.search_n_iter = search_n_iter
+        self.search_tol = search_tol
+        self._search_models = {}
 
     def select(self):
         raise NotImplementedError
 
+    def fit(self, num_states, X=None, lengths=None, fold=None):
+        ''' GaussianHMM for this word, from the fit cache if there is one, trained on all of its
+        sequences unless X, lengths and the fold that produced them are given
+        '''
+        if X is None:
+            X, lengths = self.X, self.lengths
+        return fit_model(self.fit_cache, self.this_word, num_states, X, lengths, fold=fold,
+                         random_state=self.random_state, covariance_type="diag", n_iter=1000)
+
+    def candidate(self, num_states, X=None, lengths=None, fold=None):
+        ''' model scored for num_states during selection: a full fit, or in
+        adaptive mode a quick search fit
+        '''
+        if self.adaptive:
+            return self.search_fit(num_states, X, lengths, fold)
+        return self.fit(num_states, X, lengths, fold)
+
+    def search_fit(self, num_states, X=None, lengths=None, fold=None):
+        ''' GaussianHMM fitted with the loose search settings, starting from the model last searched
+        on the same fold with one state split in two
+        '''
+        if X is None:
+            X, lengths = self.X, self.lengths
+        model = GaussianHMM(n_components=num_states, covariance_type="diag", n_iter=self.search_n_iter,
+                            tol=self.search_tol, random_state=self.random_state)
+        previous = self._search_models.get(fold)
+        if previous is not None and previous.n_components < num_states:
+            model.startprob_, model.transmat_, model.means_, model.covars_ = grown_parameters(previous,
+                                                                                            num_states)
+            model.init_params = ''
+        model.fit(X, lengths)
+        self._search_models[fold] = model
+        return model
+
+    def best_num_components(self, score_n):
+        ''' number of states from min_n_components to max_n_components with the highest score_n(n)
+
+        Numbers of states that fail to fit are skipped.  In adaptive mode the search stops once
+        the score has not improved for self.patience numbers of states in a row.
+
+        :param score_n: function of the number of states, higher is better
+        :return: int, or None if no number of states could be scored
+        '''
+        best_score, best_n, worse = float('-inf'), None, 0
+        for n in range(self.min_n_components, self.max_n_components + 1):
+            try:
+                score = score_n(n)
+            except Exception:
+                score = float('-inf')
+            if score > best_score:
+                best_score, best_n, worse = score, n, 0
+            else:
+                worse += 1
+                if self.adaptive and worse >= self.patience:
+                    break
+        return best_n
+
+    def select_best(self, score_n):
+        ''' full model for the best number of states, see best_num_components '''
+        warnings.filterwarnings("ignore", category=DeprecationWarning)
+        best_n = self.best_num_components(score_n)
+        if best_n is None:
+            return self.base_model(self.n_constant)
+        model = self.base_model(best_n)
+        return model if model is not None else self.base_model(self.n_constant)
+
     def base_model(self, num_states):
         # with warnings.catch_warnings():
         warnings.filterwarnings("ignore", category=DeprecationWarning)
         # warnings.filterwarnings("ignore", category=RuntimeWarning)
         try:
-            hmm_model = GaussianHMM(n_components=num_states, covariance_type="diag", n_iter=1000,
-                                    random_state=self.random_state, verbose=False).fit(self.X, self.lengths)
+            hmm_model = self.fit(num_states)
             if self.verbose:
                 print("model created for {} with {} states".format(self.this_word, num_states))
             return hmm_model
@@ -71,9 +241,8 @@ class SelectorBIC(ModelSelector):
     def score_bic(self, n):
         '''
         '''
-        # model = self.base_model(n)
-        model = GaussianHMM(n_components=n, n_iter=1000).fit(self.X, self.lengths)
-        logL = model.score(self.x, self.lengths)
+        model = self.candidate(n)
+        logL = model.score(self.X, self.lengths)
         logN = np.log(len(self.X))
 
         d = len(self.X[0])
@@ -89,21 +258,7 @@ class SelectorBIC(ModelSelector):
 
         :return: GaussianHMM object
         """
-        warnings.filterwarnings("ignore", category=DeprecationWarning)
-
-        try:
-            best_score = float('Inf')
-            best_model = None
-
-            for n in range(self.min_n_components, self.max_n_components + 1):
-                score, model = self.score_bic(n)
-
-                if score > best_score:
-                    best_score = score
-                    best_model = model
-            return best_model
-        except:
-            return self.base_model(self.n_constant)
+        return self.select_best(lambda n: -self.score_bic(n)[0])
 
 
 class SelectorDIC(ModelSelector):
@@ -113,35 +268,131 @@ class SelectorDIC(ModelSelector):
     Document Analysis and Recognition, 2003. Proceedings. Seventh International Conference on. IEEE, 2003.
     http://citeseerx.ist.psu.edu/viewdoc/download?doi=10.1.1.58.6208&rep=rep1&type=pdf
     DIC = log(P(X(i)) - 1/(M-1)SUM(log(P(X(all but i))
+
+    A DICEngine built for the same training set can be passed as dic_engine to share its log
+    likelihood matrix between the selectors of several words; its numbers of states and
+    random_state are used.  Otherwise each selector builds its own, for its word alone.
     '''
 
+    def __init__(self, *args, dic_engine=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dic_engine = dic_engine
+
+    def engine(self):
+        if self.dic_engine is None:
+            self.dic_engine = DICEngine(self.hwords, self.min_n_components, self.max_n_components,
+                                        self.random_state, self.fit_cache)
+        return self.dic_engine
+
     def score_dic(self, n):
         '''
         '''
-        # model = self.base_model(n)
-        model = GaussianHMM(n_components=n, n_iter=1000).fit(self.X, self.lengths)
-        scores = []
-        for w, (X, lenghts) in self.hwords.items():
-            if w != self.this_word:
-                scores.append(model.score(X, lenghts))
-        score = (model.score(self.X, self.lengths) - np.mean(scores), model)
-        return (score, model)
+        engine = self.engine()
+        i = engine.n_components.index(n)
+        return engine.dic(self.this_word)[i], engine.models[self.this_word][i]
 
     def select(self):
         warnings.filterwarnings("ignore", category=DeprecationWarning)
-        try:
-            best_score = float('-inf')
-            best_model = None
+        best_model = self.engine().select(self.this_word)
+        if best_model is None:
+            return self.base_model(self.n_constant)
+        return best_model
 
-            for n in range(self.min_n_components, self.max_n_components + 1):
-                score, model = self.score_dic(n)
 
-                if score > best_score:
-                    best_score = score
-                    best_model = model
-            return best_model
-        except:
-            return self.base_model(self.n_constant)
+class DICEngine(object):
+    '''
+    DIC scores of every word's candidate models, derived from one (model x word) log likelihood
+    matrix
+
+    The rows of a word are computed once: its candidate models are trained (through the fit cache
+    if one is given)
+    and each one scores all the words in a single batched forward pass.  compute() fills the whole
+    matrix, sharing the words out to worker processes.
+    '''
+
+    def __init__(self, all_word_Xlengths: dict, min_n_components=2, max_n_components=10,
+                 random_state=14, fit_cache=None):
+        self.hwords = all_word_Xlengths
+        self.words = list(all_word_Xlengths)
+        self.word_index = {word: i for i, word in enumerate(self.words)}
+        self.n_components = list(range(min_n_components, max_n_components + 1))
+        self.random_state = random_state
+        self.fit_cache = fit_cache
+        self.batch = SequenceBatch([all_word_Xlengths[word] for word in self.words])
+        # per word, the candidate models (None where fitting failed) and their log likelihood
+        # rows, one row per candidate and one column per word
+        self.models = {}
+        self.log_likelihood = {}
+
+    def score_word(self, word):
+        """ train the candidate models of a word and score all words against them
+
+        :return: (list of GaussianHMM or None, array of shape (candidates, words))
+        """
+        X, lengths = self.hwords[word]
+        models = []
+        for n in self.n_components:
+            try:
+                model = fit_model(self.fit_cache, word, n, X, lengths, random_state=self.random_state,
+                                  covariance_type="diag", n_iter=1000)
+            except Exception:
+                model = None
+            models.append(model)
+        return models, np.array([self.batch.score(model) for model in models])
+
+    def rows(self, word):
+        if word not in self.log_likelihood:
+            self.models[word], self.log_likelihood[word] = self.score_word(word)
+        return self.log_likelihood[word]
+
+    def compute(self, n_jobs=1):
+        """ fill in the full log likelihood matrix
+
+        :param n_jobs: int number of worker processes
+        :return: array of shape (words * candidates, words), rows grouped by word in self.words order
+        """
+        todo = [word for word in self.words if word not in self.log_likelihood]
+        if n_jobs == 1 or len(todo) < 2:
+            for word in todo:
+                self.rows(word)
+        else:
+            with ProcessPoolExecutor(n_jobs, initializer=_init_dic_worker, initargs=(self,)) as executor:
+                for word, (models, rows) in zip(todo, executor.map(_dic_score_word, todo)):
+                    self.models[word], self.log_likelihood[word] = models, rows
+        return np.vstack([self.log_likelihood[word] for word in self.words])
+
+    def dic(self, word):
+        """ DIC of each candidate model of a word: its log likelihood for the word minus the
+        mean of its finite log likelihoods for the other words
+
+        :return: array with one score per candidate, -inf for models that failed
+        """
+        rows = self.rows(word)
+        i = self.word_index[word]
+        own = rows[:, i]
+        others = np.delete(rows, i, axis=1)
+        finite = np.isfinite(others)
+        counts = finite.sum(axis=1)
+        mean_others = np.where(finite, others, 0.0).sum(axis=1) / np.maximum(counts, 1)
+        return np.where(np.isfinite(own), own - mean_others, float('-inf'))
+
+    def select(self, word):
+        """ candidate model of a word with the highest DIC, None if every candidate failed """
+        scores = self.dic(word)
+        if not np.isfinite(scores).any():
+            return None
+        return self.models[word][int(np.argmax(scores))]
+
+
+_dic_worker = {}
+
+
+def _init_dic_worker(engine):
+    _dic_worker['engine'] = engine
+
+
+def _dic_score_word(word):
+    return _dic_worker['engine'].score_word(word)
 
 
 class SelectorCV(ModelSelector):
@@ -156,23 +407,43 @@ class SelectorCV(ModelSelector):
         for cv_train_idx, cv_test_idx in split_method.split(self.sequences):
             X_train, l_train = combine_sequences(cv_train_idx, self.sequences)
             X_test, l_test = combine_sequences(cv_test_idx, self.sequences)
-            model = GaussianHMM(n_components=n, n_iter=1000).fit(X_train, l_train)
+            model = self.candidate(n, X_train, l_train, fold=tuple(int(i) for i in cv_train_idx))
             logL = model.score(X_test, l_test)
             scores.append(logL)
-        return (np.mean, model)
+        return (np.mean(scores), model)
 
     def select(self):
-        warnings.filterwarnings("ignore", category=DeprecationWarning)
-        try:
-            best_score = float('-inf')
-            best_model = None
+        return self.select_best(lambda n: self.score_cv(n)[0])
 
-            for n in range(self.min_n_components, self.max_n_components + 1):
-                score, model = self.score_cv(n)
 
-                if score > best_score:
-                    best_score = score
-                    best_model = model
-            return best_model
-        except:
-            return self.base_model(self.n_constant)
+def grown_parameters(model, num_states):
+    '''
+    parameters of a diagonal GaussianHMM grown to num_states states, each new state made by
+    splitting the state with the largest variance in two along its standard deviations
+
+    :param model: fitted GaussianHMM with fewer than num_states states
+    :return: (startprob, transmat, means, diagonal covars)
+    '''
+    startprob = model.startprob_.copy()
+    transmat = model.transmat_.copy()
+    means = model.means_.copy()
+    covars = np.asarray(model.covars_)
+    variances = np.diagonal(covars, axis1=1, axis2=2).copy() if covars.ndim == 3 else covars.copy()
+    while len(means) < num_states:
+        k = int(np.argmax(variances.sum(axis=1)))
+        offset = 0.5 * np.sqrt(variances[k])
+        means = np.vstack((means, means[k] + offset))
+        means[k] -= offset
+        variances = np.vstack((variances, variances[k]))
+        startprob = np.append(startprob, startprob[k] / 2)
+        startprob[k] /= 2
+        n = len(transmat)
+        grown = np.zeros((n + 1, n + 1))
+        grown[:n, :n] = transmat
+        grown[:n, k] = grown[:n, n] = transmat[:, k] / 2
+        grown[n] = grown[k]
+        transmat = grown
+    # a little probability everywhere, so that the search can still move away from zeros
+    startprob = (startprob + 1e-3) / (startprob + 1e-3).sum()
+    transmat = (transmat + 1e-3) / (transmat + 1e-3).sum(axis=1, keepdims=True)
+    return startprob, transmat, means, variances
@@ -1,5 +1,13 @@
+import copy
+import csv
+import os
 import warnings
+
+import numpy as np
+
 from asl_data import SinglesData
+from asl_language_model import SENTENCE_END
+from asl_scoring import SequenceBatch, logsumexp
 
 
 def recognize(models: dict, test_set: SinglesData):
@@ -18,22 +26,228 @@ def recognize(models: dict, test_set: SinglesData):
            ['WORDGUESS0', 'WORDGUESS1', 'WORDGUESS2',...]
    """
     warnings.filterwarnings("ignore", category=DeprecationWarning)
-    probabilities = []
-    guesses = []
-    test_sequences = list(test_set.get_all_Xlengths().values())
-    for test_X, test_length in test_sequences:
-        best_score = float('-inf')
-        best_guess = None
-        logL_dict = {}
-        for word, model in models.items():
-            try:
-                logL = model.score(test_X, test_length)
-                logL_dict[word] = logL
-            except:
-                logL_dict[word] = float('-inf')
-            if logL > best_score:
-                best_score = logL
-                best_guess = word
-        probabilities.append(logL_dict)
-        guesses.append(best_guess)
+    words = list(models)
+    batch = SequenceBatch(list(test_set.get_all_Xlengths().values()))
+    # one row of log likelihoods per word model, one column per test item
+    scores = np.array([batch.score(models[word]) for word in words]).reshape(len(words), batch.num_items)
+    probabilities = [dict(zip(words, scores[:, item].tolist())) for item in range(batch.num_items)]
+    guesses = [None] * batch.num_items
+    for item in range(batch.num_items):
+        column = scores[:, item]
+        if words and column.max() > float('-inf'):
+            guesses[item] = words[int(np.argmax(column))]
     return probabilities, guesses
+
+
+def recognize_sentences(models: dict, test_set: SinglesData, language_model, lm_weight=10.0, beam_width=20,
+                        candidates=None):
+    """ Recognize test words sentence by sentence, combining the word models with a language model
+
+    :param models: dict of trained models, as for recognize
+    :param test_set: SinglesData object
+    :param language_model: object with start() and log_prob(history, word), e.g. NgramLanguageModel
+    :param lm_weight: float weight of the language model log probabilities against the HMM log likelihoods
+    :param beam_width: int number of partial sentences kept after each word
+    :param candidates: int number of best scoring words per item to consider, None for all of them
+    :return: (list, list)  as probabilities, guesses, in the same format as recognize
+    """
+    probabilities, guesses = recognize(models, test_set)
+    return probabilities, decode_sentences(probabilities, guesses, test_set.sentences_index, language_model,
+                                           lm_weight, beam_width, candidates)
+
+
+def decode_sentences(probabilities: list, guesses: list, sentences_index: dict, language_model,
+                     lm_weight=10.0, beam_width=20, candidates=None):
+    """ Beam search over the word slots of each sentence for the words maximizing
+
+        sum of HMM log likelihoods + lm_weight * language model log probability
+
+    Partial sentences ending in the same language model history are recombined, keeping the best.
+
+    :param probabilities: list of dicts of log likelihoods by word, as returned by recognize
+    :param guesses: list of isolated word guesses, kept for items outside any sentence
+    :param sentences_index: dict of lists of item indices in sentence order, see SinglesData
+    :return: list of guesses ordered by test item
+    """
+    guesses = list(guesses)
+    for items in sentences_index.values():
+        # beam maps a language model history to (score, words so far)
+        beam = {language_model.start(): (0.0, ())}
+        for item in items:
+            options = [(logL, word) for word, logL in probabilities[item].items() if logL > float('-inf')]
+            if not options:
+                break
+            options.sort(reverse=True)
+            options = options[:candidates]
+            extended = {}
+            for history, (score, words) in beam.items():
+                for logL, word in options:
+                    new_score = score + logL + lm_weight * language_model.log_prob(history, word)
+                    new_history = (history + (word,))[1:] if history else history
+                    if new_history not in extended or new_score > extended[new_history][0]:
+                        extended[new_history] = (new_score, words + (word,))
+            beam = dict(sorted(extended.items(), key=lambda entry: entry[1][0], reverse=True)[:beam_width])
+        else:
+            _, words = max((score + lm_weight * language_model.log_prob(history, SENTENCE_END), words)
+                           for history, (score, words) in beam.items())
+            for item, word in zip(items, words):
+                guesses[item] = word
+    return guesses
+
+
+class StreamingRecognizer(object):
+    ''' word recognizer fed one frame at a time
+
+    The forward variables of every word model are kept in one (models x states) array, padded to
+    the largest number of states, and updated for each new frame with the same log space recursion
+    as the batched recognizer.  Work and memory per frame are fixed by the models, not by the
+    length of the stream, and the best words so far are available after every frame.  Call
+    reset() at the start of each word, or see recognize_stream.
+    '''
+
+    def __init__(self, models: dict):
+        """
+        :param models: dict of trained models, as returned by train_all_words; models that are
+            missing or not diagonal GaussianHMMs always score -inf
+        """
+        self.words = list(models)
+        usable = [i for i, word in enumerate(self.words)
+                  if models[word] is not None and models[word].covariance_type == 'diag'
+                  and SequenceBatch.is_valid(models[word])]
+        self.usable = np.array(usable, dtype=int)
+        n_states = max([models[self.words[i]].n_components for i in usable] or [1])
+        n_features = models[self.words[usable[0]]].means_.shape[1] if usable else 0
+        self.log_startprob = np.full((len(usable), n_states), float('-inf'))
+        self.log_transmat = np.full((len(usable), n_states, n_states), float('-inf'))
+        self.means = np.zeros((len(usable), n_states, n_features))
+        self.variances = np.ones((len(usable), n_states, n_features))
+        with np.errstate(divide='ignore'):
+            for row, i in enumerate(usable):
+                model = models[self.words[i]]
+                k = model.n_components
+                covars = np.asarray(model.covars_)
+                variances = np.diagonal(covars, axis1=1, axis2=2) if covars.ndim == 3 else covars
+                self.log_startprob[row, :k] = np.log(model.startprob_)
+                self.log_transmat[row, :k, :k] = np.log(model.transmat_)
+                self.means[row, :k] = model.means_
+                self.variances[row, :k] = np.maximum(variances, np.finfo(float).tiny)
+        self.log_norm = -0.5 * (n_features * np.log(2 * np.pi) + np.log(self.variances).sum(axis=2))
+        self.reset()
+
+    def reset(self):
+        """ forget the frames seen so far, to start recognizing a new word """
+        self.log_alpha = None
+        self.log_likelihood = None
+        self.num_frames = 0
+        # running argmax over the usable models, updated with every frame
+        self.best_word = self.words[0] if self.words else None
+        self.best_log_likelihood = float('-inf')
+
+    def update(self, x):
+        """ consume one frame
+
+        :param x: sequence of feature values, in the order the models were trained with
+        :return: (str, float) best word so far and its log likelihood
+        """
+        x = np.asarray(x, dtype=float)
+        log_b = self.log_norm - 0.5 * ((x - self.means) ** 2 / self.variances).sum(axis=2)
+        if self.log_alpha is None:
+            self.log_alpha = self.log_startprob + log_b
+        else:
+            self.log_alpha = logsumexp(np.swapaxes(self.log_alpha[:, :, None] + self.log_transmat, 1, 2)) + log_b
+        self.log_likelihood = logsumexp(self.log_alpha)
+        self.num_frames += 1
+        if len(self.usable):
+            k = int(np.argmax(self.log_likelihood))
+            self.best_word, self.best_log_likelihood = self.words[self.usable[k]], float(self.log_likelihood[k])
+        return self.best_word, self.best_log_likelihood
+
+    def scores(self) -> dict:
+        """ log likelihood of the frames since the last reset under each word model """
+        scores = np.full(len(self.words), float('-inf'))
+        if self.log_likelihood is not None and len(self.usable):
+            scores[self.usable] = self.log_likelihood
+        return dict(zip(self.words, scores.tolist()))
+
+    def best(self, n=1) -> list:
+        """ the n best words so far
+
+        :return: list of (word, log likelihood) tuples, best first
+        """
+        if n == 1:
+            return [(self.best_word, self.best_log_likelihood)]
+        return sorted(self.scores().items(), key=lambda item: item[1], reverse=True)[:n]
+
+
+def read_frames(hands_fn=os.path.join('data', 'hands_condensed.csv'), feature_list=('right-y', 'right-x')):
+    """ generator over the rows of the hands csv file, read one at a time
+
+    Only columns present in the file can be used as features; derived features need AslDb.
+
+    :param hands_fn: str filename of hand position csv data, see AslDb
+    :param feature_list: sequence of str column names
+    :return: generator of (video, frame, list of float) tuples
+    """
+    with open(hands_fn, newline='') as f:
+        for row in csv.DictReader(f):
+            yield int(row['video']), int(row['frame']), [float(row[feature]) for feature in feature_list]
+
+
+def recognize_stream(recognizer: StreamingRecognizer, frames, segments=None):
+    """ running recognition of the words in a frame stream
+
+    Words whose frames overlap are followed at the same time, each by its own copy of the
+    recognizer; the copies share the model parameters and only hold their forward variables.
+    The segments are read one at a time as the stream reaches them and dropped when they end,
+    so memory is bounded by the words open at the same time, not by the length of the input.
+
+    :param recognizer: StreamingRecognizer used as a template, its own state is left alone
+    :param frames: iterable of (video, frame, features) tuples in stream order, see read_frames
+    :param segments: iterable of (video, startframe, endframe) word boundaries in stream order:
+        grouped by video in the order the videos come in frames, and by startframe within a
+        video.  None follows each video of the stream as a single word.
+    :return: generator of (segment index, frame, best word so far, log likelihood) for each frame
+        inside a segment; the index counts the segments in the order given, or is the video
+        number without segments
+    :raises ValueError: at the end of the stream, if a segment names a video the stream never
+        reached before moving past it; the segments after it could not be followed
+    """
+    segments = enumerate(segments) if segments is not None else None
+    pending = next(segments, None) if segments is not None else None
+    # segment index -> (last frame, None to the end of the video, recognizer)
+    active = {}
+    current = None
+    passed = set()
+    for video, frame, x in frames:
+        if video != current:
+            # words whose last frames are missing from the stream end with their video
+            active.clear()
+            passed.add(current)
+            while pending is not None and pending[1][0] in passed:
+                pending = next(segments, None)
+            current = video
+            if segments is None:
+                active[video] = (None, _fresh_copy(recognizer))
+        while pending is not None and pending[1][0] == video and pending[1][1] <= frame:
+            i, (_, start, end) = pending
+            if end >= frame:
+                active[i] = (end, _fresh_copy(recognizer))
+            pending = next(segments, None)
+        for i, (end, word_recognizer) in list(active.items()):
+            word, logL = word_recognizer.update(x)
+            yield i, frame, word, logL
+            if end == frame:
+                del active[i]
+    passed.add(current)
+    while pending is not None and pending[1][0] in passed:
+        pending = next(segments, None)
+    if pending is not None:
+        i, (video, _, _) = pending
+        raise ValueError("segment {} names video {}, which is not in the frame stream "
+                         "or not in the same order".format(i, video))
+
+
+def _fresh_copy(recognizer):
+    copied = copy.copy(recognizer)
+    copied.reset()
+    return copied
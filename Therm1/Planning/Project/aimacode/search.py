@@ -12,6 +12,8 @@ from .utils import (
 from .grid import distance
 
 from collections import defaultdict
+import heapq
+import itertools
 import math
 import random
 import sys
@@ -237,6 +239,151 @@ def breadth_first_search(problem):
     return None
 
 
+def bidirectional_goal_states(problem, max_goal_states):
+    """The goal states a backward search starts from: problem.goal_states() if
+    the problem defines it, or else the single state problem.goal. Returns
+    None if there are more than max_goal_states of them; goal_states may be a
+    generator, so no more than that are enumerated."""
+    if not hasattr(problem, 'goal_states'):
+        return [problem.goal]
+    goal_states = list(itertools.islice(problem.goal_states(), max_goal_states + 1))
+    return goal_states if len(goal_states) <= max_goal_states else None
+
+
+def join_bidirectional_path(problem, node, link):
+    """Extend the forward node with the path back to a goal kept by the
+    backward search node link on the same state."""
+    while link.parent is not None:
+        next_state = link.parent.state
+        node = Node(next_state, node, link.action,
+                    problem.path_cost(node.path_cost, node.state, link.action, next_state))
+        link = link.parent
+    return node
+
+
+def bidirectional_breadth_first_search(problem, max_goal_states=10000):
+    """Breadth-first search forwards from the initial state and backwards from
+    the goal states, one whole layer at a time on the smaller side, until the
+    two searches meet; the first meeting gives a shortest path. The actions
+    must be invertible: problem.inverse(state, action) returns the action that
+    leads from problem.result(state, action) back to state, so the backward
+    search can generate predecessors with problem.actions and problem.result.
+    The goal states are those of bidirectional_goal_states; when there are
+    more than max_goal_states, this is a plain breadth_first_search."""
+    goal_states = bidirectional_goal_states(problem, max_goal_states)
+    if goal_states is None:
+        record_search_stats(problem, goal_states='> {}'.format(max_goal_states))
+        return breadth_first_search(problem)
+    record_search_stats(problem, goal_states=len(goal_states))
+    forward = {problem.initial: Node(problem.initial)}
+    backward = {}
+    for state in goal_states:
+        backward[state] = Node(state)
+
+    if problem.initial in backward:
+        return join_bidirectional_path(problem, forward[problem.initial], backward[problem.initial])
+    forward_layer, backward_layer = list(forward.values()), list(backward.values())
+    while forward_layer and backward_layer:
+        if len(forward_layer) <= len(backward_layer):
+            next_layer = []
+            for node in forward_layer:
+                for child in node.expand(problem):
+                    if child.state in forward:
+                        continue
+                    forward[child.state] = child
+                    if child.state in backward:
+                        return join_bidirectional_path(problem, child, backward[child.state])
+                    next_layer.append(child)
+            forward_layer = next_layer
+        else:
+            next_layer = []
+            for node in backward_layer:
+                for action in problem.actions(node.state):
+                    state = problem.result(node.state, action)
+                    if state in backward:
+                        continue
+                    backward[state] = Node(state, node, problem.inverse(node.state, action))
+                    if state in forward:
+                        return join_bidirectional_path(problem, forward[state], backward[state])
+                    next_layer.append(backward[state])
+            backward_layer = next_layer
+    return None
+
+
+def bidirectional_astar_search(problem, h=None, h_backward=None, max_goal_states=10000):
+    """A* forwards from the initial state and backwards from the goal states,
+    expanding the side with the lower f value first. The cheapest path found
+    where the two searches meet is kept until one side has no node left with
+    an f value below its cost. h estimates the cost to a goal, as for
+    astar_search; h_backward(node) estimates the cost from the initial state
+    to node.state and defaults to 0, a uniform cost search backwards. Both
+    must be consistent for the path to be optimal. The actions must be
+    invertible and the goal states are found as for
+    bidirectional_breadth_first_search; when there are more than
+    max_goal_states, this is a plain astar_search."""
+    h = memoize(h or problem.h, 'h')
+    h_backward = memoize(h_backward or (lambda node: 0), 'h_backward')
+    goal_states = bidirectional_goal_states(problem, max_goal_states)
+    if goal_states is None:
+        record_search_stats(problem, goal_states='> {}'.format(max_goal_states))
+        return astar_search(problem, h)
+    record_search_stats(problem, goal_states=len(goal_states))
+
+    counter = itertools.count()
+    root = Node(problem.initial)
+    # one side of the search: state -> best node, and a heap of (f, tie, node)
+    forward = ({root.state: root}, [(h(root), next(counter), root)])
+    backward = ({}, [])
+    for state in goal_states:
+        node = Node(state)
+        backward[0][state] = node
+        heapq.heappush(backward[1], (h_backward(node), next(counter), node))
+
+    best_cost, best = infinity, None
+    if problem.initial in backward[0]:
+        best_cost, best = 0, (root, backward[0][problem.initial])
+
+    def lowest_f(side):
+        nodes, frontier = side
+        while frontier and nodes.get(frontier[0][2].state) is not frontier[0][2]:
+            heapq.heappop(frontier)
+        return frontier[0][0] if frontier else infinity
+
+    while True:
+        forward_f, backward_f = lowest_f(forward), lowest_f(backward)
+        if max(forward_f, backward_f) >= best_cost:
+            break
+        if forward_f <= backward_f:
+            nodes, frontier = forward
+            node = heapq.heappop(frontier)[2]
+            for child in node.expand(problem):
+                if child.state in nodes and nodes[child.state].path_cost <= child.path_cost:
+                    continue
+                nodes[child.state] = child
+                heapq.heappush(frontier, (child.path_cost + h(child), next(counter), child))
+                if child.state in backward[0]:
+                    link = backward[0][child.state]
+                    if child.path_cost + link.path_cost < best_cost:
+                        best_cost, best = child.path_cost + link.path_cost, (child, link)
+        else:
+            nodes, frontier = backward
+            node = heapq.heappop(frontier)[2]
+            for action in problem.actions(node.state):
+                state = problem.result(node.state, action)
+                inverse = problem.inverse(node.state, action)
+                cost = problem.path_cost(node.path_cost, state, inverse, node.state)
+                if state in nodes and nodes[state].path_cost <= cost:
+                    continue
+                link = Node(state, node, inverse, cost)
+                nodes[state] = link
+                heapq.heappush(frontier, (cost + h_backward(link), next(counter), link))
+                if state in forward[0]:
+                    child = forward[0][state]
+                    if child.path_cost + cost < best_cost:
+                        best_cost, best = child.path_cost + cost, (child, link)
+    return join_bidirectional_path(problem, *best) if best else None
+
+
 def best_first_graph_search(problem, f):
     """Search the nodes with the lowest f scores first.
     You specify the function f(node) that you want to minimize; for example,
@@ -351,6 +498,137 @@ def recursive_best_first_search(problem, h=None):
     return result
 
 
+def iterative_deepening_astar_search(problem, h=None, max_table_size=100000):
+    """Iterative deepening A* (IDA*): a sequence of depth-first searches, each
+    bounded by an f-cost limit that is raised to the smallest f value which
+    exceeded the previous limit. A transposition table maps every state seen
+    to its h value and to the lowest path cost at which it was reached in the
+    current iteration, so repeated states are pruned and h is computed once
+    per state. The table stops growing once it holds max_table_size states."""
+    h = h or problem.h
+    table = {}
+
+    def contour_search(node, bound, iteration):
+        entry = table.get(node.state)
+        if entry is None:
+            h_value = h(node)
+            if len(table) < max_table_size:
+                table[node.state] = [h_value, node.path_cost, iteration]
+        else:
+            h_value, g, seen_in = entry
+            if seen_in == iteration and g <= node.path_cost:
+                return None, infinity
+            entry[1], entry[2] = node.path_cost, iteration
+        f = node.path_cost + h_value
+        if f > bound:
+            return None, f
+        if problem.goal_test(node.state):
+            return node, f
+        next_bound = infinity
+        for child in node.expand(problem):
+            result, t = contour_search(child, bound, iteration)
+            if result is not None:
+                return result, t
+            next_bound = min(next_bound, t)
+        return None, next_bound
+
+    bound = h(Node(problem.initial))
+    result = None
+    iteration = 0
+    while result is None and bound < infinity:
+        iteration += 1
+        result, bound = contour_search(Node(problem.initial), bound, iteration)
+    record_search_stats(problem, iterations=iteration, table_size=len(table))
+    return result
+
+
+def memory_bounded_astar_search(problem, h=None, max_nodes=10000):
+    """Simplified memory-bounded A* (SMA*). Proceeds like A* until max_nodes
+    nodes are held in memory, then forgets the shallowest leaf with the
+    highest f value and backs its f value up into its parent, which is
+    regenerated if it becomes the best node again. A successor is skipped
+    while its state is held in memory at no greater path cost. Successors are
+    generated all at once rather than one at a time, so max_nodes should
+    exceed the solution depth times the branching factor. Returns the optimal
+    solution that fits within the memory bound, or None."""
+    h = memoize(h or problem.h, 'h')
+    counter = itertools.count()
+    open_heap, leaf_heap = [], []
+    in_memory = {}
+    stats = dict(peak_nodes=1, forgotten=0, regenerated=0)
+
+    def open_key(node):
+        return node.f if node.children is None else node.forgotten
+
+    def push(node):
+        if open_key(node) < infinity:
+            heapq.heappush(open_heap, (open_key(node), -node.depth, next(counter), node))
+        if not node.children and node is not root:
+            heapq.heappush(leaf_heap, (-node.f, node.depth, next(counter), node))
+
+    def backup(node):
+        while node is not None:
+            f = min([child.f for child in node.children] + [node.forgotten])
+            if f == node.f:
+                return
+            node.f = f
+            push(node)
+            node = node.parent
+
+    root = Node(problem.initial)
+    root.f, root.children, root.forgotten, root.in_memory = h(root), None, infinity, True
+    in_memory[root.state] = root
+    used = 1
+    push(root)
+    while open_heap:
+        key, _, _, node = heapq.heappop(open_heap)
+        if not node.in_memory or key != open_key(node):
+            continue
+        if node.children is None:
+            if problem.goal_test(node.state):
+                record_search_stats(problem, **stats)
+                return node
+            node.children, known, floor = [], set(), node.f
+        else:
+            stats['regenerated'] += 1
+            known = {child.state for child in node.children}
+            floor = max(node.f, node.forgotten)
+        node.forgotten = infinity
+        known.update(ancestor.state for ancestor in node.path())
+        for child in node.expand(problem):
+            if child.state in known:
+                continue
+            duplicate = in_memory.get(child.state)
+            if duplicate is not None and duplicate.path_cost <= child.path_cost:
+                continue
+            if child.depth >= max_nodes - 1:
+                child.f = infinity
+            else:
+                child.f = max(floor, child.path_cost + h(child))
+            child.children, child.forgotten, child.in_memory = None, infinity, True
+            node.children.append(child)
+            in_memory[child.state] = child
+            used += 1
+            push(child)
+        stats['peak_nodes'] = max(stats['peak_nodes'], used)
+        backup(node)
+        push(node)
+        while used > max_nodes and leaf_heap:
+            neg_f, _, _, leaf = heapq.heappop(leaf_heap)
+            if not leaf.in_memory or leaf.children or leaf.f != -neg_f:
+                continue
+            leaf.in_memory = False
+            if in_memory.get(leaf.state) is leaf:
+                del in_memory[leaf.state]
+            leaf.parent.children.remove(leaf)
+            leaf.parent.forgotten = min(leaf.parent.forgotten, leaf.f)
+            used -= 1
+            stats['forgotten'] += 1
+            push(leaf.parent)
+    record_search_stats(problem, **stats)
+    return None
+
+
 def hill_climbing(problem):
     """From the initial node, keep choosing the neighbor with highest value,
     stopping when no neighbor is better. [Figure 4.2]"""
@@ -805,6 +1083,10 @@ class GraphProblem(Problem):
     def path_cost(self, cost_so_far, A, action, B):
         return cost_so_far + (self.graph.get(A, B) or infinity)
 
+    def inverse(self, A, action):
+        "Going back from a neighbor leads to A; only valid for undirected graphs."
+        return A
+
     def h(self, node):
         "h function is straight-line distance from a node's state to goal."
         locs = getattr(self.graph, 'locations', None)
@@ -1106,6 +1388,7 @@ class InstrumentedProblem(Problem):
         self.problem = problem
         self.succs = self.goal_tests = self.states = 0
         self.found = None
+        self.search_stats = {}
 
     def actions(self, state):
         self.succs += 1
@@ -1136,6 +1419,13 @@ class InstrumentedProblem(Problem):
                                      self.states, str(self.found)[:4])
 
 
+def record_search_stats(problem, **stats):
+    """Report algorithm-specific statistics (iterations, peak memory, ...)
+    to an InstrumentedProblem; other problems ignore them."""
+    if isinstance(problem, InstrumentedProblem):
+        problem.search_stats.update(stats)
+
+
 def compare_searchers(problems, header,
                       searchers=[breadth_first_tree_search,
                                  breadth_first_search,
@@ -0,0 +1,125 @@
+import argparse
+from timeit import default_timer as timer
+
+from aimacode.search import InstrumentedProblem, Node
+from my_air_cargo_problems import air_cargo_random
+from run_search import SEARCHES
+
+HEADER = "{:>7}  {:>7}  {:>7}  {:>10}  {:>10}  {:>10}  {:>8}"
+
+
+class ExpansionLimitReached(Exception):
+    """ raised when a benchmarked search uses up its expansion budget """
+
+
+class LimitedProblem(InstrumentedProblem):
+    """ InstrumentedProblem that stops the search after a fixed number of
+    expansions, so that expansion rates can be measured on problems too
+    large to solve.
+    """
+
+    def __init__(self, problem, max_expansions):
+        InstrumentedProblem.__init__(self, problem)
+        self.max_expansions = max_expansions
+
+    def actions(self, state):
+        if self.succs >= self.max_expansions:
+            raise ExpansionLimitReached()
+        return InstrumentedProblem.actions(self, state)
+
+
+def time_grounding(problem, repeats=1):
+    """ average seconds taken by problem.get_actions() grounding from scratch """
+    elapsed = 0.0
+    for _ in range(repeats):
+        problem.ground_actions.clear()
+        start = timer()
+        problem.get_actions()
+        elapsed += timer() - start
+    return elapsed / repeats
+
+
+def time_heuristic(problem, heuristic, repeats=1):
+    """ average seconds taken by one heuristic evaluation of the initial state """
+    h = getattr(problem, heuristic)
+    start = timer()
+    for _ in range(repeats):
+        h(Node(problem.initial))
+    return (timer() - start) / repeats
+
+
+def time_search(problem, search_function, heuristic, max_expansions):
+    """ run a search until it finishes or exhausts its expansion budget
+
+    Searches that do not expand the planning problem itself (goal regression)
+    are not limited by the budget; their own expansions, reported through
+    search_stats, are counted instead.
+
+    :return: (expansions, seconds, plan length or None if unsolved)
+    """
+    ip = LimitedProblem(problem, max_expansions)
+    start = timer()
+    try:
+        if heuristic:
+            node = search_function(ip, getattr(problem, heuristic))
+        else:
+            node = search_function(ip)
+    except ExpansionLimitReached:
+        node = None
+    elapsed = timer() - start
+    expansions = ip.succs + ip.search_stats.get('regressions', 0)
+    return expansions, elapsed, None if node is None else len(node.solution())
+
+
+def main(cargo_counts, n_planes, n_airports, seed, search_choices, heuristics, max_expansions, repeats,
+         lazy_grounding=False):
+    print("\nRandom air cargo problems: {} planes, {} airports, seed {}".format(n_planes, n_airports, seed))
+    print("Searches stop after {} expansions".format(max_expansions))
+    if lazy_grounding:
+        print("Lazy grounding: Ground(s) is not paid up front; Actions counts those grounded during search")
+    print()
+    columns = ["Cargos", "Fluents", "Actions", "Ground(s)", "Search(s)", "Exp/sec", "Plan"]
+    widths = [max(12, len(h) + 4) for h in heuristics]
+    header = HEADER.format(*columns) + "".join("  {:>{}}".format(h + "(ms)", w) for h, w in zip(heuristics, widths))
+
+    for search_choice in search_choices:
+        sname, search_function, search_heuristic = SEARCHES[search_choice - 1]
+        hstring = search_heuristic if not search_heuristic else " with {}".format(search_heuristic)
+        print("{}{}".format(sname, hstring))
+        print(header)
+        for n in cargo_counts:
+            problem = air_cargo_random(n, n_planes, n_airports, seed, lazy_grounding)
+            ground = 0.0 if lazy_grounding else time_grounding(problem, repeats)
+            expansions, elapsed, plan = time_search(problem, search_function, search_heuristic, max_expansions)
+            rate = expansions / elapsed if elapsed else float('inf')
+            row = HEADER.format(n, len(problem.initial), len(problem.ground_actions),
+                                "{:.4f}".format(ground), "{:.3f}".format(elapsed),
+                                "{:.1f}".format(rate), "-" if plan is None else plan)
+            for h, w in zip(heuristics, widths):
+                row += "  {:>{}.3f}".format(1000 * time_heuristic(problem, h, repeats), w)
+            print(row)
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark grounding, search and heuristic " +
+        "costs on randomly generated air cargo problems of increasing size.")
+    parser.add_argument('-n', '--cargos', nargs="+", type=int, default=[2, 4, 8, 16],
+                        help="Numbers of cargos to generate problems for.")
+    parser.add_argument('-m', '--planes', type=int, default=2, help="Number of planes.")
+    parser.add_argument('-k', '--airports', type=int, default=3, help="Number of airports.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the problem generator.")
+    parser.add_argument('-s', '--searches', nargs="+", type=int, default=[9], choices=range(1, len(SEARCHES)+1), metavar='',
+                        help="Indices of the search algorithms to compare, as listed by run_search.py. Choose from: {!s}".format(list(range(1, len(SEARCHES)+1))))
+    parser.add_argument('--heuristics', nargs="*", default=['h_ignore_preconditions', 'h_pg_levelsum'],
+                        help="Heuristics to time on each initial state.")
+    parser.add_argument('-e', '--max-expansions', type=int, default=1000,
+                        help="Stop each search after this many expansions.")
+    parser.add_argument('-r', '--repeats', type=int, default=1,
+                        help="Number of repetitions for the grounding and heuristic timings.")
+    parser.add_argument('--lazy', action="store_true",
+                        help="Ground actions on demand instead of in the problem constructor.")
+    args = parser.parse_args()
+
+    main(args.cargos, args.planes, args.airports, args.seed, args.searches,
+         args.heuristics, args.max_expansions, args.repeats, args.lazy)
@@ -1,3 +1,6 @@
+import itertools
+import random
+
 from aimacode.logic import PropKB
 from aimacode.planning import Action
 from aimacode.search import (
@@ -8,10 +11,11 @@ from lp_utils import (
     FluentState, encode_state, decode_state,
 )
 from my_planning_graph import PlanningGraph
+from pattern_database import build_pattern_databases
 
 
 class AirCargoProblem(Problem):
-    def __init__(self, cargos, planes, airports, initial: FluentState, goal: list):
+    def __init__(self, cargos, planes, airports, initial: FluentState, goal: list, lazy_grounding=False):
         """
 
         :param cargos: list of str
@@ -24,6 +28,9 @@ class AirCargoProblem(Problem):
             positive and negative literal fluents (as expr) describing initial state
         :param goal: list of expr
             literal fluents required for goal test
+        :param lazy_grounding: bool
+            if True, concrete actions are not all created up front; `actions` only
+            grounds the actions applicable in the state it is given
         """
         self.state_map = initial.pos + initial.neg
         self.initial_state_TF = encode_state(initial, self.state_map)
@@ -31,7 +38,26 @@ class AirCargoProblem(Problem):
         self.cargos = cargos
         self.planes = planes
         self.airports = airports
-        self.actions_list = self.get_actions()
+        self.lazy_grounding = lazy_grounding
+        # concrete actions grounded on demand, keyed by their position in get_actions order
+        self.ground_actions = {}
+        self._actions_list = None
+        self._fluent_args = [(f.op, str(f.args[0]), str(f.args[1])) for f in self.state_map]
+        self._cargo_set = set(cargos)
+        self._index = {name: i for names in (cargos, planes, airports) for i, name in enumerate(names)}
+        # pattern databases for h_pdb, built on first use
+        self.pattern_databases = None
+        self.pdb_pattern_size = 2
+        self.pdb_cache_dir = None
+        if not lazy_grounding:
+            self._actions_list = self.get_actions()
+
+    @property
+    def actions_list(self) -> list:
+        """ all concrete actions of the problem; grounded on first use in lazy mode """
+        if self._actions_list is None:
+            self._actions_list = self.get_actions()
+        return self._actions_list
 
     def get_actions(self):
         '''
@@ -61,17 +87,7 @@ class AirCargoProblem(Problem):
             for p in self.planes:
                 for c in self.cargos:
                     for a in self.airports:
-                        precond_pos = [
-                            expr('At({}, {})'.format(c, a)),
-                            expr('At({}, {})'.format(p, a))
-                        ]
-                        precond_neg = []
-                        effect_add = [expr('In({}, {})'.format(c, p))]
-                        effect_rem = [expr('At({}, {})'.format(c, a))]
-                        load = Action(expr('Load({}, {}, {})'.format(c, p, a)),
-                                      [precond_pos, precond_neg],
-                                      [effect_add, effect_rem])
-                        loads.append(load)
+                        loads.append(self.load_action(c, p, a))
             return loads
 
         def unload_actions():
@@ -83,17 +99,7 @@ class AirCargoProblem(Problem):
             for p in self.planes:
                 for c in self.cargos:
                     for a in self.airports:
-                        precond_pos = [
-                            expr('In({}, {})'.format(c, p)),
-                            expr('At({}, {})'.format(p, a))
-                        ]
-                        precond_neg = []
-                        effect_add = [expr('At({}, {})'.format(c, a))]
-                        effect_rem = [expr('In({}, {})'.format(c, p))]
-                        unload = Action(expr('Unload({}, {}, {})'.format(c, p, a)),
-                                        [precond_pos, precond_neg],
-                                        [effect_add, effect_rem])
-                        unloads.append(unload)
+                        unloads.append(self.unload_action(c, p, a))
             return unloads
 
         def fly_actions():
@@ -106,19 +112,66 @@ class AirCargoProblem(Problem):
                 for to in self.airports:
                     if fr != to:
                         for p in self.planes:
-                            precond_pos = [expr('At({}, {})'.format(p, fr)),
-                                           ]
-                            precond_neg = []
-                            effect_add = [expr('At({}, {})'.format(p, to))]
-                            effect_rem = [expr('At({}, {})'.format(p, fr))]
-                            fly = Action(expr('Fly({}, {}, {})'.format(p, fr, to)),
-                                         [precond_pos, precond_neg],
-                                         [effect_add, effect_rem])
-                            flys.append(fly)
+                            flys.append(self.fly_action(p, fr, to))
             return flys
 
         return load_actions() + unload_actions() + fly_actions()
 
+    def load_action(self, c: str, p: str, a: str) -> Action:
+        '''Create the concrete action Load(c, p, a), reusing it if already grounded
+
+        :return: Action object
+        '''
+        key = (0, self._index[p], self._index[c], self._index[a])
+        if key not in self.ground_actions:
+            precond_pos = [
+                expr('At({}, {})'.format(c, a)),
+                expr('At({}, {})'.format(p, a))
+            ]
+            precond_neg = []
+            effect_add = [expr('In({}, {})'.format(c, p))]
+            effect_rem = [expr('At({}, {})'.format(c, a))]
+            self.ground_actions[key] = Action(expr('Load({}, {}, {})'.format(c, p, a)),
+                                              [precond_pos, precond_neg],
+                                              [effect_add, effect_rem])
+        return self.ground_actions[key]
+
+    def unload_action(self, c: str, p: str, a: str) -> Action:
+        '''Create the concrete action Unload(c, p, a), reusing it if already grounded
+
+        :return: Action object
+        '''
+        key = (1, self._index[p], self._index[c], self._index[a])
+        if key not in self.ground_actions:
+            precond_pos = [
+                expr('In({}, {})'.format(c, p)),
+                expr('At({}, {})'.format(p, a))
+            ]
+            precond_neg = []
+            effect_add = [expr('At({}, {})'.format(c, a))]
+            effect_rem = [expr('In({}, {})'.format(c, p))]
+            self.ground_actions[key] = Action(expr('Unload({}, {}, {})'.format(c, p, a)),
+                                              [precond_pos, precond_neg],
+                                              [effect_add, effect_rem])
+        return self.ground_actions[key]
+
+    def fly_action(self, p: str, fr: str, to: str) -> Action:
+        '''Create the concrete action Fly(p, fr, to), reusing it if already grounded
+
+        :return: Action object
+        '''
+        key = (2, self._index[fr], self._index[to], self._index[p])
+        if key not in self.ground_actions:
+            precond_pos = [expr('At({}, {})'.format(p, fr)),
+                           ]
+            precond_neg = []
+            effect_add = [expr('At({}, {})'.format(p, to))]
+            effect_rem = [expr('At({}, {})'.format(p, fr))]
+            self.ground_actions[key] = Action(expr('Fly({}, {}, {})'.format(p, fr, to)),
+                                              [precond_pos, precond_neg],
+                                              [effect_add, effect_rem])
+        return self.ground_actions[key]
+
     def actions(self, state: str) -> list:
         """ Return the actions that can be executed in the given state.
 
@@ -127,6 +180,8 @@ class AirCargoProblem(Problem):
             e.g. 'FTTTFF'
         :return: list of Action objects
         """
+        if self.lazy_grounding:
+            return self.applicable_actions(state)
         possible_actions = []
         kb = PropKB()
         kb.tell(decode_state(state, self.state_map).pos_sentence())
@@ -142,6 +197,44 @@ class AirCargoProblem(Problem):
                 possible_actions.append(action)
         return possible_actions
 
+    def applicable_actions(self, state: str) -> list:
+        """ Ground only the actions applicable in the given state.
+
+        Instead of testing every concrete action, the planes, cargos and their
+        locations are read off the state, and Load, Unload and Fly actions are
+        generated from them.  The actions come back in the same order as
+        `actions` returns them in eager mode.
+
+        :param state: str
+            state represented as T/F string of mapped fluents (state variables)
+        :return: list of Action objects
+        """
+        cargos_at = {}
+        planes_at = {}
+        loaded = {}
+        for (op, x, y), value in zip(self._fluent_args, state):
+            if value != 'T':
+                continue
+            if op == 'In':
+                loaded.setdefault(y, []).append(x)
+            elif x in self._cargo_set:
+                cargos_at.setdefault(y, []).append(x)
+            else:
+                planes_at.setdefault(x, []).append(y)
+        index = self._index
+        possible_actions = []
+        for p, airports in planes_at.items():
+            for a in airports:
+                for c in cargos_at.get(a, ()):
+                    possible_actions.append(((0, index[p], index[c], index[a]), self.load_action(c, p, a)))
+                for c in loaded.get(p, ()):
+                    possible_actions.append(((1, index[p], index[c], index[a]), self.unload_action(c, p, a)))
+                for to in self.airports:
+                    if to != a:
+                        possible_actions.append(((2, index[a], index[to], index[p]), self.fly_action(p, a, to)))
+        possible_actions.sort(key=lambda pair: pair[0])
+        return [action for _, action in possible_actions]
+
     def result(self, state: str, action: Action):
         """ Return the state that results from executing the given
         action in the given state. The action must be one of
@@ -168,6 +261,46 @@ class AirCargoProblem(Problem):
                 new_state.neg.append(fluent)
         return encode_state(new_state, self.state_map)
 
+    def inverse(self, state: str, action: Action) -> Action:
+        """ Return the action that undoes `action` after it is executed in `state`:
+        Load and Unload undo each other, and a plane flies back the way it came.
+
+        :param state: state the action was executed in
+        :param action: Action applied
+        :return: Action object
+        """
+        x, y, z = (str(arg) for arg in action.args)
+        if action.name == 'Load':
+            return self.unload_action(x, y, z)
+        if action.name == 'Unload':
+            return self.load_action(x, y, z)
+        return self.fly_action(x, z, y)
+
+    def goal_states(self):
+        """ Generate every complete state that satisfies the goal.
+
+        Each cargo is either at an airport or in a plane and each plane is at
+        an airport; locations fixed by the goal are kept, the others range over
+        all possibilities, so the number of goal states grows exponentially
+        with the number of cargos and planes the goal leaves free. They are
+        generated one at a time, so the bidirectional searches can stop
+        enumerating them past their max_goal_states.
+
+        :return: generator of str states
+        """
+        fixed = {str(g.args[0]): g for g in self.goal if g.op == 'At'}
+        options = []
+        for c in self.cargos:
+            options.append([fixed[c]] if c in fixed else
+                           [expr('At({}, {})'.format(c, a)) for a in self.airports] +
+                           [expr('In({}, {})'.format(c, p)) for p in self.planes])
+        for p in self.planes:
+            options.append([fixed[p]] if p in fixed else
+                           [expr('At({}, {})'.format(p, a)) for a in self.airports])
+        for pos in itertools.product(*options):
+            pos = set(pos)
+            yield "".join('T' if fluent in pos else 'F' for fluent in self.state_map)
+
     def goal_test(self, state: str) -> bool:
         """ Test the state to see if goal is reached
 
@@ -198,6 +331,18 @@ class AirCargoProblem(Problem):
         pg_levelsum = pg.h_levelsum()
         return pg_levelsum
 
+    def h_pdb(self, node: Node):
+        '''
+        This heuristic looks up precomputed pattern databases: for each group
+        of pdb_pattern_size cargos, the exact number of actions needed to
+        deliver that group while ignoring every other cargo.  Each lookup is
+        admissible, and so is their maximum.  The databases are built on the
+        first call, and cached on disk if pdb_cache_dir is set.
+        '''
+        if self.pattern_databases is None:
+            self.pattern_databases = build_pattern_databases(self, self.pdb_pattern_size, self.pdb_cache_dir)
+        return max((pdb[node.state] for pdb in self.pattern_databases), default=0)
+
     def h_ignore_preconditions(self, node: Node):
         '''
         This heuristic estimates the minimum number of actions that must be
@@ -326,3 +471,47 @@ def air_cargo_p3() -> AirCargoProblem:
             expr('At(C4, SFO)'),
             ]
     return AirCargoProblem(cargos, planes, airports, init, goal)
+
+
+def air_cargo_random(n_cargos: int, n_planes: int, n_airports: int, seed=None,
+                     lazy_grounding=False) -> AirCargoProblem:
+    """ Generate an air cargo problem of arbitrary size
+
+    Cargos and planes start at random airports, and each cargo must be
+    delivered to a random airport other than the one it starts at.  The same
+    seed always produces the same problem.
+
+    :param n_cargos: int
+        number of cargos, named C1..CN
+    :param n_planes: int
+        number of planes, named P1..PM
+    :param n_airports: int
+        number of airports (at least 2), named A1..AK
+    :param seed: hashable
+        seed for the random generator
+    :param lazy_grounding: bool
+        ground actions on demand rather than in the constructor
+    :return: AirCargoProblem
+    """
+    if n_airports < 2:
+        raise ValueError("air cargo problems need at least two airports")
+    rng = random.Random(seed)
+    cargos = ['C{}'.format(i) for i in range(1, n_cargos + 1)]
+    planes = ['P{}'.format(i) for i in range(1, n_planes + 1)]
+    airports = ['A{}'.format(i) for i in range(1, n_airports + 1)]
+    cargo_at = {c: rng.choice(airports) for c in cargos}
+    plane_at = {p: rng.choice(airports) for p in planes}
+    pos = []
+    neg = []
+    for c in cargos:
+        for a in airports:
+            (pos if cargo_at[c] == a else neg).append(expr('At({}, {})'.format(c, a)))
+        for p in planes:
+            neg.append(expr('In({}, {})'.format(c, p)))
+    for p in planes:
+        for a in airports:
+            (pos if plane_at[p] == a else neg).append(expr('At({}, {})'.format(p, a)))
+    init = FluentState(pos, neg)
+    goal = [expr('At({}, {})'.format(c, rng.choice([a for a in airports if a != cargo_at[c]])))
+            for c in cargos]
+    return AirCargoProblem(cargos, planes, airports, init, goal, lazy_grounding)
@@ -0,0 +1,205 @@
+import hashlib
+import os
+from array import array
+from collections import deque
+from itertools import product
+
+UNREACHED = 255
+
+
+class PatternDatabase():
+    """ Goal distances of an abstraction of an air cargo problem
+
+    The abstraction keeps every plane but only the cargos in `pattern`; the
+    other cargos are ignored.  Any plan for the real problem is also a plan
+    for the abstraction once the actions on ignored cargos are dropped, so the
+    abstract distance to the goal is an admissible estimate.
+
+    With keep_planes=False the planes are abstracted away as well: a cargo is
+    either at an airport or "in a plane", it can be loaded anywhere and
+    unloaded anywhere, and flights are free.  This is much weaker but its size
+    no longer grows as airports**planes.
+
+    Abstract states are numbered in mixed radix: each plane contributes its
+    airport and each pattern cargo its location (an airport, or a plane).  The
+    distances of all abstract states are computed once by a breadth-first
+    search from the abstract goal states and stored one byte per state.
+    """
+
+    def __init__(self, problem, pattern: list, cache_dir=None, max_states=2000000, keep_planes=True):
+        """
+
+        :param problem: AirCargoProblem
+        :param pattern: list of str
+            cargos kept in the abstraction
+        :param cache_dir: str
+            directory where distance tables are stored between runs, keyed by
+            the abstract problem description; None disables the disk cache
+        :param max_states: int
+            refuse to build abstractions with more states than this
+        :param keep_planes: bool
+            keep the plane positions in the abstraction
+        """
+        self.pattern = list(pattern)
+        self.keep_planes = keep_planes
+        planes, airports = list(problem.planes), list(problem.airports)
+        n_airports = len(airports)
+        if keep_planes:
+            self.radices = [n_airports] * len(planes) + [n_airports + len(planes)] * len(self.pattern)
+        else:
+            self.radices = [n_airports + 1] * len(self.pattern)
+        self.weights = []
+        self.size = 1
+        for radix in self.radices:
+            self.weights.append(self.size)
+            self.size *= radix
+        if self.size > max_states:
+            raise ValueError("pattern {} has {} abstract states, more than {}".format(
+                self.pattern, self.size, max_states))
+
+        location = {a: i for i, a in enumerate(airports)}
+        if keep_planes:
+            location.update((p, n_airports + i) for i, p in enumerate(planes))
+            objects = planes + self.pattern
+        else:
+            location.update((p, n_airports) for p in planes)
+            objects = list(self.pattern)
+        slot = {obj: j for j, obj in enumerate(objects)}
+        goal_at = {str(g.args[0]): location[str(g.args[1])] for g in problem.goal
+                   if g.op == 'At' and str(g.args[0]) in slot}
+        self.goal_choices = [[goal_at[obj]] if obj in goal_at else list(range(radix))
+                             for obj, radix in zip(objects, self.radices)]
+
+        # value added to the abstract index by each true fluent of a concrete state
+        self.contributions = []
+        for i, fluent in enumerate(problem.state_map):
+            obj = str(fluent.args[0])
+            if obj in slot:
+                where = location[str(fluent.args[1])]
+                self.contributions.append((i, where * self.weights[slot[obj]]))
+
+        description = repr((planes, airports, keep_planes, [(obj, goal_at.get(obj)) for obj in objects]))
+        self.key = hashlib.sha1(description.encode('utf-8')).hexdigest()
+        self.distances = self.load(cache_dir)
+        if self.distances is None:
+            self.distances = self.build(n_airports, len(planes) if keep_planes else 0)
+            self.save(cache_dir)
+
+    def build(self, n_airports: int, n_planes: int) -> array:
+        """ Breadth-first search from all abstract goal states
+
+        Every action is invertible (Load/Unload, Fly back), so distances from the
+        goal states are distances to them.  Without planes a cargo at an airport
+        can be loaded, and a loaded cargo unloaded at any airport.
+
+        :return: array of bytes, the distance of each abstract state
+        """
+        distances = array('B', [UNREACHED]) * self.size
+        queue = deque()
+        for positions in product(*self.goal_choices):
+            idx = sum(pos * w for pos, w in zip(positions, self.weights))
+            distances[idx] = 0
+            queue.append(idx)
+        plane_weights = self.weights[:n_planes]
+        cargo_weights = self.weights[n_planes:]
+        while queue:
+            idx = queue.popleft()
+            d = min(distances[idx] + 1, UNREACHED - 1)
+            positions = []
+            rest = idx
+            for radix in self.radices:
+                rest, pos = divmod(rest, radix)
+                positions.append(pos)
+            plane_at = positions[:n_planes]
+            successors = []
+            for w, a in zip(plane_weights, plane_at):
+                successors.extend(idx + (b - a) * w for b in range(n_airports) if b != a)
+            for w, pos in zip(cargo_weights, positions[n_planes:]):
+                if not self.keep_planes:
+                    if pos < n_airports:
+                        successors.append(idx + (n_airports - pos) * w)
+                    else:
+                        successors.extend(idx + (b - pos) * w for b in range(n_airports))
+                elif pos < n_airports:
+                    successors.extend(idx + (n_airports + p - pos) * w
+                                      for p, a in enumerate(plane_at) if a == pos)
+                else:
+                    successors.append(idx + (plane_at[pos - n_airports] - pos) * w)
+            for s in successors:
+                if distances[s] == UNREACHED:
+                    distances[s] = d
+                    queue.append(s)
+        return distances
+
+    def path(self, cache_dir: str) -> str:
+        return os.path.join(cache_dir, '{}.pdb'.format(self.key))
+
+    def load(self, cache_dir):
+        """ Read the distance table from the disk cache, if present
+
+        Files that are not exactly one byte per abstract state are ignored.
+
+        :return: array of bytes or None
+        """
+        if cache_dir is None:
+            return None
+        distances = array('B')
+        try:
+            if os.path.getsize(self.path(cache_dir)) != self.size:
+                return None
+            with open(self.path(cache_dir), 'rb') as f:
+                distances.fromfile(f, self.size)
+        except (OSError, EOFError):
+            return None
+        return distances
+
+    def save(self, cache_dir):
+        """ Write the distance table to the disk cache; the cache is only an
+        optimisation, so failures to write it are ignored """
+        if cache_dir is None:
+            return
+        partial = self.path(cache_dir) + '.{}.tmp'.format(os.getpid())
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(partial, 'wb') as f:
+                self.distances.tofile(f)
+            os.replace(partial, self.path(cache_dir))
+        except OSError:
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+
+    def __getitem__(self, state: str) -> int:
+        """ abstract goal distance of a concrete T/F state string """
+        idx = 0
+        for i, value in self.contributions:
+            if state[i] == 'T':
+                idx += value
+        d = self.distances[idx]
+        return float('inf') if d == UNREACHED else d
+
+
+def build_pattern_databases(problem, pattern_size=2, cache_dir=None, max_states=2000000) -> list:
+    """ Split the cargos that have a goal into patterns of pattern_size cargos
+    and build a PatternDatabase for each
+
+    A pattern whose abstraction has more than max_states states is split into
+    single cargos, and if those are still too big (the planes alone give
+    airports**planes states) it is built without planes.
+
+    :return: list of PatternDatabase
+    """
+    cargos = [c for c in problem.cargos
+              if any(g.op == 'At' and str(g.args[0]) == c for g in problem.goal)]
+    databases = []
+    for i in range(0, len(cargos), pattern_size):
+        pattern = cargos[i:i + pattern_size]
+        try:
+            databases.append(PatternDatabase(problem, pattern, cache_dir, max_states))
+        except ValueError:
+            try:
+                databases.extend([PatternDatabase(problem, [c], cache_dir, max_states) for c in pattern])
+            except ValueError:
+                databases.append(PatternDatabase(problem, pattern, cache_dir, max_states, keep_planes=False))
+    return databases
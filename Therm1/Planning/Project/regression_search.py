@@ -0,0 +1,177 @@
+from aimacode.search import (
+    Node, Problem, InstrumentedProblem, astar_search, breadth_first_search,
+    record_search_stats,
+)
+
+
+class RegressionProblem(Problem):
+    """ Backward (goal regression) view of a planning problem
+
+    States are subgoals: a pair of sorted tuples holding the indices, in the
+    planning problem's `state_map`, of the fluents that must be true and of
+    those that must be false.  The search starts from the goal and regresses
+    it through the concrete actions of the planning problem until it reaches a
+    subgoal satisfied by the initial state.  The actions found, read from the
+    goal back to the start, are the forward plan in reverse.
+
+    Subgoals that can never be reached are pruned using "at most one" fluent
+    groups: fluents sharing their first argument (e.g. every At(C1, _) and
+    In(C1, _)) of which at most one is true initially, and which no action can
+    make two of true at once.
+    """
+
+    def __init__(self, problem: Problem):
+        """
+
+        :param problem: planning problem exposing `state_map`, `actions_list`,
+            a T/F string `initial` state and a `goal` list of positive fluents
+        """
+        self.planning_problem = problem
+        self.fluent_index = {fluent: i for i, fluent in enumerate(problem.state_map)}
+        self.initial_true = frozenset(i for i, value in enumerate(problem.initial) if value == 'T')
+        self.action_sets = []
+        self.achievers = {}
+        for action in problem.actions_list:
+            pre_pos, pre_neg, add, rem = (frozenset(self.fluent_index[f] for f in fluents)
+                                          for fluents in (action.precond_pos, action.precond_neg,
+                                                          action.effect_add, action.effect_rem))
+            idx = len(self.action_sets)
+            self.action_sets.append((action, pre_pos, pre_neg, add, rem))
+            for i in add:
+                self.achievers.setdefault((True, i), []).append(idx)
+            for i in rem:
+                self.achievers.setdefault((False, i), []).append(idx)
+        self.group = self.exclusive_groups(problem.state_map)
+        goal = (tuple(sorted(self.fluent_index[f] for f in problem.goal)), ())
+        Problem.__init__(self, goal)
+
+    def exclusive_groups(self, state_map: list) -> dict:
+        """ Find the groups of fluents of which at most one can ever be true
+
+        Candidate groups are fluents with the same first argument.  A group is
+        kept if at most one of its fluents is true in the initial state and every
+        action adding a group fluent also deletes one of its own preconditions
+        from the group, which preserves the property.
+
+        :param state_map: ordered list of fluents
+        :return: dict mapping fluent index to group id, for grouped fluents only
+        """
+        candidates = {}
+        for i, fluent in enumerate(state_map):
+            if fluent.args:
+                candidates.setdefault(fluent.args[0], set()).add(i)
+        group = {}
+        for gid, members in enumerate(candidates.values()):
+            if len(members & self.initial_true) > 1:
+                continue
+            if all(not (add & members) or (len(add & members) == 1 and rem & pre_pos & members)
+                   for _, pre_pos, _, add, rem in self.action_sets):
+                for i in members:
+                    group[i] = gid
+        return group
+
+    def reachable(self, pos) -> bool:
+        """ False if two true fluents of the subgoal belong to the same exclusive group
+
+        :param pos: iterable of true fluent indices
+        :return: bool
+        """
+        seen = set()
+        for i in pos:
+            gid = self.group.get(i)
+            if gid is not None:
+                if gid in seen:
+                    return False
+                seen.add(gid)
+        return True
+
+    def actions(self, subgoal: tuple) -> list:
+        """ Return the indices of the actions relevant to the subgoal: those that
+        achieve at least one of its literals without undoing any other, and
+        whose regressed subgoal is not unreachable
+
+        :param subgoal: (tuple of true fluent indices, tuple of false fluent indices)
+        :return: list of int
+        """
+        pos, neg = subgoal
+        candidates = set()
+        for i in pos:
+            candidates.update(self.achievers.get((True, i), ()))
+        for i in neg:
+            candidates.update(self.achievers.get((False, i), ()))
+        relevant = []
+        for idx in sorted(candidates):
+            _, pre_pos, _, add, rem = self.action_sets[idx]
+            if (rem.isdisjoint(pos) and add.isdisjoint(neg) and
+                    self.reachable((set(pos) - add) | pre_pos)):
+                relevant.append(idx)
+        return relevant
+
+    def result(self, subgoal: tuple, idx: int) -> tuple:
+        """ Regress the subgoal through an action
+
+        :param subgoal: (tuple of true fluent indices, tuple of false fluent indices)
+        :param idx: index of a relevant action
+        :return: the subgoal that must hold before the action
+        """
+        _, pre_pos, pre_neg, add, rem = self.action_sets[idx]
+        pos = (set(subgoal[0]) - add) | pre_pos
+        neg = (set(subgoal[1]) - rem) | pre_neg
+        return tuple(sorted(pos)), tuple(sorted(neg))
+
+    def goal_test(self, subgoal: tuple) -> bool:
+        """ The backward search is done when the initial state satisfies the subgoal
+
+        :param subgoal: (tuple of true fluent indices, tuple of false fluent indices)
+        :return: bool
+        """
+        pos, neg = subgoal
+        return self.initial_true.issuperset(pos) and self.initial_true.isdisjoint(neg)
+
+    def h_unsatisfied(self, node: Node) -> int:
+        '''
+        This heuristic counts the literals of the subgoal that do not hold in
+        the initial state.  It is admissible for domains such as air cargo in
+        which every action achieves exactly one literal.
+        '''
+        pos, neg = node.state
+        return (sum(1 for i in pos if i not in self.initial_true) +
+                sum(1 for i in neg if i in self.initial_true))
+
+    def forward_plan(self, node: Node) -> Node:
+        """ Replay the actions found by the backward search on the planning problem
+
+        :param node: goal node of a search over this problem
+        :return: Node of the planning problem whose solution() is the forward plan
+        """
+        plan = Node(self.planning_problem.initial)
+        for idx in reversed(node.solution()):
+            plan = plan.child_node(self.planning_problem, self.action_sets[idx][0])
+        return plan
+
+
+def _regression_search(problem, search_function, *args):
+    regression = InstrumentedProblem(RegressionProblem(problem))
+    node = search_function(regression, *args)
+    record_search_stats(problem, regressions=regression.succs, regression_goal_tests=regression.goal_tests,
+                        subgoals=regression.states)
+    return None if node is None else regression.forward_plan(node)
+
+
+def goal_regression_search(problem):
+    """ Breadth-first search backwards from the goal over regressed subgoals
+
+    :param problem: planning problem, see RegressionProblem
+    :return: Node of the planning problem at the end of the plan, or None
+    """
+    return _regression_search(problem, breadth_first_search)
+
+
+def goal_regression_astar_search(problem):
+    """ A* search backwards from the goal over regressed subgoals, using
+    RegressionProblem.h_unsatisfied
+
+    :param problem: planning problem, see RegressionProblem
+    :return: Node of the planning problem at the end of the plan, or None
+    """
+    return _regression_search(problem, lambda p: astar_search(p, p.h_unsatisfied))
@@ -4,8 +4,11 @@ from aimacode.search import InstrumentedProblem
 from aimacode.search import (breadth_first_search, astar_search,
     breadth_first_tree_search, depth_first_graph_search, uniform_cost_search,
     greedy_best_first_graph_search, depth_limited_search,
-    recursive_best_first_search)
+    recursive_best_first_search, iterative_deepening_astar_search,
+    memory_bounded_astar_search, bidirectional_breadth_first_search,
+    bidirectional_astar_search)
 from my_air_cargo_problems import air_cargo_p1, air_cargo_p2, air_cargo_p3
+from regression_search import goal_regression_search, goal_regression_astar_search
 
 PROBLEM_CHOICE_MSG = """
 Select from the following list of air cargo problems. You may choose more than
@@ -36,6 +39,13 @@ SEARCHES = [["breadth_first_search", breadth_first_search, ""],
             ['astar_search', astar_search, 'h_1'],
             ['astar_search', astar_search, 'h_ignore_preconditions'],
             ['astar_search', astar_search, 'h_pg_levelsum'],
+            ['iterative_deepening_astar_search', iterative_deepening_astar_search, 'h_ignore_preconditions'],
+            ['memory_bounded_astar_search', memory_bounded_astar_search, 'h_ignore_preconditions'],
+            ['bidirectional_breadth_first_search', bidirectional_breadth_first_search, ""],
+            ['goal_regression_search', goal_regression_search, ""],
+            ['goal_regression_astar_search', goal_regression_astar_search, ""],
+            ['astar_search', astar_search, 'h_pdb'],
+            ['bidirectional_astar_search', bidirectional_astar_search, 'h_ignore_preconditions'],
             ]
 
 
@@ -46,7 +56,11 @@ class PrintableProblem(InstrumentedProblem):
     """
 
     def __repr__(self):
-        return '{:^10d}  {:^10d}  {:^10d}'.format(self.succs, self.goal_tests, self.states)
+        counts = '{:^10d}  {:^10d}  {:^10d}'.format(self.succs, self.goal_tests, self.states)
+        if not self.search_stats:
+            return counts
+        extra = "  ".join("{}: {}".format(k, v) for k, v in sorted(self.search_stats.items()))
+        return "{}\n{}".format(counts, extra)
 
 
 def run_search(problem, search_function, parameter=None):
@@ -4,11 +4,17 @@ parent = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(os.path.join(os.path.dirname(parent), "aimacode"))
 from aimacode.planning import Action
 from aimacode.utils import expr
-from aimacode.search import Node
+from aimacode.search import (
+    Node, iterative_deepening_astar_search, memory_bounded_astar_search,
+    bidirectional_breadth_first_search, bidirectional_astar_search,
+)
+import tempfile
 import unittest
 from lp_utils import decode_state
+from pattern_database import PatternDatabase, build_pattern_databases
+from regression_search import goal_regression_search, goal_regression_astar_search
 from my_air_cargo_problems import (
-    air_cargo_p1, air_cargo_p2, air_cargo_p3,
+    air_cargo_p1, air_cargo_p2, air_cargo_p3, air_cargo_random,
 )
 
 class TestAirCargoProb1(unittest.TestCase):
@@ -47,6 +53,49 @@ class TestAirCargoProb3(unittest.TestCase):
         self.assertEqual(len(self.p3.goal),4)
 
 
+class TestAirCargoRandom(unittest.TestCase):
+
+    def setUp(self):
+        self.p = air_cargo_random(5, 3, 4, seed=7)
+
+    def test_ACR_num_fluents(self):
+        self.assertEqual(len(self.p.initial), 5 * (4 + 3) + 3 * 4)
+        self.assertEqual(self.p.initial.count('T'), 5 + 3)
+
+    def test_ACR_num_actions(self):
+        self.assertEqual(len(self.p.actions_list), 2 * 5 * 3 * 4 + 4 * 3 * 3)
+
+    def test_ACR_goal_not_satisfied(self):
+        self.assertEqual(len(self.p.goal), 5)
+        self.assertFalse(self.p.goal_test(self.p.initial))
+
+    def test_ACR_seeded(self):
+        other = air_cargo_random(5, 3, 4, seed=7)
+        self.assertEqual(self.p.initial, other.initial)
+        self.assertEqual(self.p.goal, other.goal)
+
+
+class TestAirCargoLazyGrounding(unittest.TestCase):
+
+    def setUp(self):
+        self.eager = air_cargo_random(4, 2, 3, seed=3)
+        self.lazy = air_cargo_random(4, 2, 3, seed=3, lazy_grounding=True)
+
+    def test_ACL_nothing_grounded_up_front(self):
+        self.assertEqual(len(self.lazy.ground_actions), 0)
+
+    def test_ACL_same_actions(self):
+        state = self.eager.initial
+        for _ in range(4):
+            eager = [(a.name, a.args) for a in self.eager.actions(state)]
+            lazy = [(a.name, a.args) for a in self.lazy.actions(state)]
+            self.assertEqual(eager, lazy)
+            state = self.lazy.result(state, self.lazy.actions(state)[0])
+
+    def test_ACL_actions_list(self):
+        self.assertEqual(len(self.lazy.actions_list), len(self.eager.actions_list))
+
+
 class TestAirCargoMethods(unittest.TestCase):
 
     def setUp(self):
@@ -80,5 +129,117 @@ class TestAirCargoMethods(unittest.TestCase):
         n = Node(self.p1.initial)
         self.assertEqual(self.p1.h_ignore_preconditions(n),2)
 
+
+class TestBoundedMemorySearch(unittest.TestCase):
+
+    def setUp(self):
+        self.p1 = air_cargo_p1()
+
+    def test_iterative_deepening_astar_search(self):
+        node = iterative_deepening_astar_search(self.p1, self.p1.h_ignore_preconditions)
+        self.assertEqual(len(node.solution()), 6)
+
+    def test_memory_bounded_astar_search(self):
+        node = memory_bounded_astar_search(self.p1, self.p1.h_ignore_preconditions, max_nodes=30)
+        self.assertEqual(len(node.solution()), 6)
+
+
+class TestBidirectionalAndRegressionSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.p1 = air_cargo_p1()
+
+    def assertValidPlan(self, node, length):
+        self.assertEqual(len(node.solution()), length)
+        state = self.p1.initial
+        for action in node.solution():
+            self.assertIn(action, self.p1.actions(state))
+            state = self.p1.result(state, action)
+        self.assertTrue(self.p1.goal_test(state))
+
+    def test_goal_states(self):
+        goal_states = list(self.p1.goal_states())
+        self.assertEqual(len(goal_states), 4)
+        self.assertTrue(all(self.p1.goal_test(state) for state in goal_states))
+
+    def test_inverse(self):
+        for action in self.p1.actions(self.p1.initial):
+            state = self.p1.result(self.p1.initial, action)
+            self.assertEqual(self.p1.result(state, self.p1.inverse(self.p1.initial, action)), self.p1.initial)
+
+    def test_bidirectional_breadth_first_search(self):
+        self.assertValidPlan(bidirectional_breadth_first_search(self.p1), 6)
+
+    def test_bidirectional_astar_search(self):
+        self.assertValidPlan(bidirectional_astar_search(self.p1, self.p1.h_ignore_preconditions), 6)
+
+    def test_too_many_goal_states(self):
+        # with fewer goal states allowed than the 4 of the problem, the searches go forwards only
+        self.assertValidPlan(bidirectional_breadth_first_search(self.p1, max_goal_states=3), 6)
+        self.assertValidPlan(bidirectional_astar_search(self.p1, self.p1.h_ignore_preconditions, max_goal_states=3), 6)
+
+    def test_goal_regression_search(self):
+        self.assertValidPlan(goal_regression_search(self.p1), 6)
+
+    def test_goal_regression_astar_search(self):
+        self.assertValidPlan(goal_regression_astar_search(self.p1), 6)
+
+class TestPatternDatabase(unittest.TestCase):
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = cache_dir.name
+        self.p1 = air_cargo_p1()
+        self.p1.pdb_cache_dir = self.cache_dir
+
+    def test_h_pdb_exact_for_full_pattern(self):
+        self.assertEqual(self.p1.h_pdb(Node(self.p1.initial)), 6)
+
+    def test_h_pdb_single_cargo_patterns(self):
+        self.p1.pdb_pattern_size = 1
+        self.assertEqual(self.p1.h_pdb(Node(self.p1.initial)), 3)
+
+    def test_disk_cache(self):
+        built = PatternDatabase(self.p1, ['C1'], self.cache_dir)
+        self.assertTrue(os.path.exists(built.path(self.cache_dir)))
+        loaded = PatternDatabase(self.p1, ['C1'], self.cache_dir)
+        self.assertEqual(loaded.distances, built.distances)
+
+    def test_disk_cache_rejects_wrong_size(self):
+        built = PatternDatabase(self.p1, ['C1'], self.cache_dir)
+        with open(built.path(self.cache_dir), 'ab') as f:
+            f.write(b'\0' * 10)
+        self.assertIsNone(built.load(self.cache_dir))
+        loaded = PatternDatabase(self.p1, ['C1'], self.cache_dir)
+        self.assertEqual(loaded.distances, built.distances)
+
+    def test_disk_cache_unwritable(self):
+        blocker = os.path.join(self.cache_dir, 'file')
+        open(blocker, 'w').close()
+        pdb = PatternDatabase(self.p1, ['C1'], os.path.join(blocker, 'pdb'))
+        self.assertEqual(pdb[self.p1.initial], 3)
+
+    def test_no_disk_cache_by_default(self):
+        self.assertIsNone(air_cargo_p1().pdb_cache_dir)
+
+    def test_split_pattern_when_too_big(self):
+        databases = build_pattern_databases(self.p1, 2, max_states=50)
+        self.assertEqual([pdb.pattern for pdb in databases], [['C1'], ['C2']])
+        self.assertEqual(max(pdb[self.p1.initial] for pdb in databases), 3)
+
+    def test_drop_planes_when_too_big(self):
+        databases = build_pattern_databases(self.p1, 2, max_states=10)
+        self.assertEqual(len(databases), 1)
+        self.assertFalse(databases[0].keep_planes)
+        self.assertEqual(databases[0][self.p1.initial], 4)
+
+    def test_h_pdb_many_planes(self):
+        problem = air_cargo_random(3, 8, 8, seed=3)
+        h = problem.h_pdb(Node(problem.initial))
+        self.assertTrue(all(not pdb.keep_planes for pdb in problem.pattern_databases))
+        self.assertGreater(h, 0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,53 @@
+import os
+import sys
+
+parent = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(os.path.dirname(parent), "aimacode"))
+import unittest
+from aimacode.search import (
+    GraphProblem, romania_map, iterative_deepening_astar_search, memory_bounded_astar_search,
+    bidirectional_breadth_first_search, bidirectional_astar_search,
+)
+
+
+class TestBoundedMemorySearchRomania(unittest.TestCase):
+
+    def setUp(self):
+        self.romania_problem = GraphProblem('Arad', 'Bucharest', romania_map)
+
+    def test_iterative_deepening_astar_search(self):
+        self.assertEqual(iterative_deepening_astar_search(self.romania_problem).solution(),
+                         ['Sibiu', 'Rimnicu', 'Pitesti', 'Bucharest'])
+        self.assertEqual(iterative_deepening_astar_search(self.romania_problem, max_table_size=2).solution(),
+                         ['Sibiu', 'Rimnicu', 'Pitesti', 'Bucharest'])
+
+    def test_memory_bounded_astar_search(self):
+        self.assertEqual(memory_bounded_astar_search(self.romania_problem).solution(),
+                         ['Sibiu', 'Rimnicu', 'Pitesti', 'Bucharest'])
+        self.assertEqual(memory_bounded_astar_search(self.romania_problem, max_nodes=8).solution(),
+                         ['Sibiu', 'Rimnicu', 'Pitesti', 'Bucharest'])
+        # the optimal path needs 5 nodes in memory; with fewer, the best shallower path is found
+        self.assertEqual(memory_bounded_astar_search(self.romania_problem, max_nodes=5).solution(),
+                         ['Sibiu', 'Fagaras', 'Bucharest'])
+
+
+class TestBidirectionalSearchRomania(unittest.TestCase):
+
+    def setUp(self):
+        self.romania_problem = GraphProblem('Arad', 'Bucharest', romania_map)
+
+    def test_bidirectional_breadth_first_search(self):
+        self.assertEqual(bidirectional_breadth_first_search(self.romania_problem).solution(),
+                         ['Sibiu', 'Fagaras', 'Bucharest'])
+
+    def test_bidirectional_astar_search(self):
+        self.assertEqual(bidirectional_astar_search(self.romania_problem).solution(),
+                         ['Sibiu', 'Rimnicu', 'Pitesti', 'Bucharest'])
+        # straight-line distances back to Arad
+        to_arad = GraphProblem('Bucharest', 'Arad', romania_map)
+        self.assertEqual(bidirectional_astar_search(self.romania_problem, h_backward=to_arad.h).solution(),
+                         ['Sibiu', 'Rimnicu', 'Pitesti', 'Bucharest'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,4 @@
-from solution import Sudoku
+from OOPsolution import Sudoku
 import unittest
 
 
@@ -96,5 +96,57 @@ class TestDiagonalSudoku(unittest.TestCase):
     def test_solve(self):
         self.assertEqual(sudoku.solve(self.diagonal_grid, display=False, gui=False), self.solved_diag_sudoku)
 
+class TestStrategies(unittest.TestCase):
+    diagonal_grid = TestDiagonalSudoku.diagonal_grid
+    solved_diag_sudoku = TestDiagonalSudoku.solved_diag_sudoku
+
+    def board(self, **boxes):
+        values = dict((box, '123456789') for box in sudoku.boxes)
+        values.update(boxes)
+        return values
+
+    def test_hidden_pairs(self):
+        values = self.board(A1='1234', A2='125', **dict((b, '3456789') for b in sudoku.cross('A', '3456789')))
+        values = sudoku.hidden_pairs(values)
+        self.assertEqual((values['A1'], values['A2']), ('12', '12'))
+
+    def test_naked_triples(self):
+        values = sudoku.naked_triples(self.board(A1='12', A2='23', A3='13'))
+        self.assertEqual((values['A1'], values['A2'], values['A3']), ('12', '23', '13'))
+        # row A and the top left square lose 1, 2 and 3; column 1 and the diagonal keep them
+        self.assertTrue(all(values[b] == '456789' for b in sudoku.cross('A', '456789')))
+        self.assertTrue(all(values[b] == '456789' for b in sudoku.cross('BC', '123')))
+        self.assertTrue(all(values[b] == '123456789' for b in sudoku.cross('DEFGHI', '1')))
+        self.assertEqual(values['E5'], '123456789')
+
+    def test_hidden_triples(self):
+        values = self.board(A1='1234', A2='2356', A3='13789', **dict((b, '456789') for b in sudoku.cross('A', '456789')))
+        values = sudoku.hidden_triples(values)
+        self.assertEqual((values['A1'], values['A2'], values['A3']), ('123', '23', '13'))
+        self.assertTrue(all(values[b] == '456789' for b in sudoku.cross('A', '456789')))
+        self.assertTrue(all(values[b] == '123456789' for b in sudoku.cross('BC', '123')))
+
+    def test_pointing_pairs(self):
+        values = sudoku.pointing_pairs(self.board(**dict((b, '23456789') for b in sudoku.cross('BC', '123'))))
+        self.assertTrue(all('1' not in values[b] for b in sudoku.cross('A', '456789')))
+        self.assertTrue(all('1' in values[b] for b in sudoku.cross('A', '123')))
+
+    def test_x_wing(self):
+        others = sudoku.cross('AE', '2346789')
+        values = sudoku.x_wing(self.board(**dict((b, '23456789') for b in others)))
+        self.assertTrue(all('1' not in values[b] for b in sudoku.cross('BCDFGHI', '15')))
+        self.assertTrue(all('1' in values[b] for b in sudoku.cross('AE', '15')))
+
+    def test_pipeline_solves(self):
+        solver = Sudoku(diagonal=True, strategies=Sudoku.STRATEGIES)
+        self.assertEqual(solver.solve(self.diagonal_grid), self.solved_diag_sudoku)
+        self.assertEqual(list(solver.stats), list(Sudoku.STRATEGIES))
+        self.assertGreater(solver.stats['eliminate']['removed'], 0)
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            Sudoku(strategies=['eliminate', 'swordfish'])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,148 @@
+"""
+Solve files of Sudoku puzzles across a pool of processes.
+
+Puzzles are read one 81-character grid per line ('.' or '0' for empty boxes) from files or
+stdin.  Each is solved in a worker process with a time limit, and one tab-separated line per
+puzzle is written with its status, solving time, search nodes, backtracks, propagations and solution
+(see sudoku_engines for what the engines count).
+A throughput summary goes to stderr.
+
+    python batch_solve.py hard_puzzles.txt -j 4 -t 5 -o solutions.tsv
+    cat puzzles.txt | python batch_solve.py --standard
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+from timeit import default_timer as timer
+
+import bitmask_solution
+import sudoku_engines
+
+HEADER = "index\tstatus\tseconds\tnodes\tbacktracks\tpropagations\tsolution"
+
+
+class PuzzleTimeout(Exception):
+    """ raised in a worker when a puzzle runs over its time limit """
+
+
+def read_puzzles(lines):
+    """
+    Yield the grids of the non-blank, non-comment lines, empty boxes as '.'
+    """
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line.replace('0', '.')
+
+
+def _raise_timeout(signum, frame):
+    raise PuzzleTimeout()
+
+
+def solve_one(job):
+    """
+    Solve one puzzle in a worker process.
+    Args:
+        job(tuple): (index, grid, engine name, diagonal, timeout in seconds or None)
+    Returns:
+        (index, status, seconds, nodes, backtracks, propagations, solution string or '')
+    """
+    index, grid, engine, diagonal, timeout = job
+    if len(grid) != 81 or any(v not in '.123456789' for v in grid):
+        return index, 'invalid', 0.0, 0, 0, 0, ''
+    # SIGALRM interrupts the search in place; without it (Windows) puzzles are not time limited
+    use_alarm = timeout and hasattr(signal, 'setitimer')
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+    start = timer()
+    try:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        values, stats = sudoku_engines.solve(grid, engine, diagonal)
+        nodes, backtracks, propagations = stats['nodes'], stats['backtracks'], stats['propagations']
+        status = 'solved' if values else 'unsolvable'
+    except PuzzleTimeout:
+        values, nodes, backtracks, propagations, status = None, 0, 0, 0, 'timeout'
+    except Exception:
+        values, nodes, backtracks, propagations, status = None, 0, 0, 0, 'error'
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    elapsed = timer() - start
+    answer = ''.join(values[box] for box in bitmask_solution.boxes) if values else ''
+    return index, status, elapsed, nodes, backtracks, propagations, answer
+
+
+def main(lines, out, engine='bitmask', diagonal=True, jobs=None, timeout=None, chunksize=8):
+    """
+    Solve every puzzle in lines, writing one result line per puzzle to out in input order.
+    Returns:
+        dict of summary counts and timings
+    """
+    jobs_iter = ((i, grid, engine, diagonal, timeout) for i, grid in enumerate(read_puzzles(lines)))
+    counts = {}
+    total_seconds = 0.0
+    slowest = 0.0
+    start = timer()
+    out.write(HEADER + '\n')
+    if jobs == 1:
+        results = map(solve_one, jobs_iter)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(jobs)
+        results = pool.imap(solve_one, jobs_iter, chunksize)
+    try:
+        for index, status, seconds, nodes, backtracks, propagations, answer in results:
+            out.write("{}\t{}\t{:.6f}\t{}\t{}\t{}\t{}\n".format(index, status, seconds, nodes, backtracks,
+                                                                 propagations, answer))
+            counts[status] = counts.get(status, 0) + 1
+            total_seconds += seconds
+            slowest = max(slowest, seconds)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    wall = timer() - start
+    puzzles = sum(counts.values())
+    return {'puzzles': puzzles, 'counts': counts, 'wall': wall, 'slowest': slowest,
+            'mean': total_seconds / puzzles if puzzles else 0.0,
+            'throughput': puzzles / wall if wall else float('inf')}
+
+
+def report(summary, stream=sys.stderr):
+    counts = ", ".join("{} {}".format(n, status) for status, n in sorted(summary['counts'].items()))
+    print("{} puzzles in {:.3f}s ({})".format(summary['puzzles'], summary['wall'], counts or "none"), file=stream)
+    print("{:.1f} puzzles/sec, mean {:.2f}ms, slowest {:.2f}ms per puzzle".format(
+        summary['throughput'], 1000 * summary['mean'], 1000 * summary['slowest']), file=stream)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Solve Sudoku puzzles, one 81-character grid per line, " +
+                                                 "across a pool of processes.")
+    parser.add_argument('files', nargs='*', help="Puzzle files; stdin when none are given.")
+    parser.add_argument('-o', '--output', help="File for the results, stdout by default.")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help="Number of worker processes.")
+    parser.add_argument('-t', '--timeout', type=float, default=None, help="Seconds allowed per puzzle.")
+    parser.add_argument('-e', '--engine', choices=sorted(sudoku_engines.ENGINES), default='bitmask',
+                        help="Solver to use.")
+    parser.add_argument('--standard', action='store_true',
+                        help="Solve standard sudoku, without the diagonal units (not with the solution engine).")
+    parser.add_argument('--chunksize', type=int, default=8, help="Puzzles handed to a worker at a time.")
+    args = parser.parse_args()
+
+    def input_lines():
+        if not args.files:
+            yield from sys.stdin
+        for filename in args.files:
+            with open(filename) as f:
+                yield from f
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        summary = main(input_lines(), out, args.engine, not args.standard, args.jobs, args.timeout, args.chunksize)
+    finally:
+        if args.output:
+            out.close()
+    report(summary)
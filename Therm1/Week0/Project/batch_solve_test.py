@@ -0,0 +1,44 @@
+import batch_solve
+import io
+import unittest
+
+
+class TestBatchSolve(unittest.TestCase):
+    diagonal_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+    hard_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+    # a standard puzzle none of the engines solves without a failed guess
+    guessing_grid = '...16.9..1.8..2..5.4....1..3.5.7..4.2.........7.........1..9....2..3....6........'
+
+    def run_batch(self, lines, **kwargs):
+        out = io.StringIO()
+        summary = batch_solve.main(lines, out, **kwargs)
+        rows = [line.split('\t') for line in out.getvalue().splitlines()[1:]]
+        return summary, rows
+
+    def test_results_in_input_order(self):
+        lines = ['# comment', self.diagonal_grid, '', 'not a puzzle', self.diagonal_grid.replace('.', '0')]
+        summary, rows = self.run_batch(lines, jobs=2)
+        self.assertEqual([row[1] for row in rows], ['solved', 'invalid', 'solved'])
+        self.assertEqual(rows[0][6], rows[2][6])
+        self.assertEqual(summary['counts'], {'solved': 2, 'invalid': 1})
+
+    def test_engines_agree(self):
+        _, bitmask_rows = self.run_batch([self.diagonal_grid], jobs=1)
+        _, dict_rows = self.run_batch([self.diagonal_grid], engine='solution', jobs=1)
+        _, dlx_rows = self.run_batch([self.diagonal_grid], engine='dlx', jobs=1)
+        self.assertEqual(bitmask_rows[0][6], dict_rows[0][6])
+        self.assertEqual(bitmask_rows[0][6], dlx_rows[0][6])
+
+    def test_backtracks_column(self):
+        _, rows = self.run_batch([self.guessing_grid], diagonal=False, jobs=1)
+        self.assertEqual(batch_solve.HEADER.split('\t')[4], 'backtracks')
+        self.assertGreater(int(rows[0][4]), 0)
+        self.assertLessEqual(int(rows[0][4]), int(rows[0][3]))
+
+    def test_timeout(self):
+        _, rows = self.run_batch([self.hard_grid], diagonal=False, jobs=1, timeout=1e-6)
+        self.assertEqual(rows[0][1], 'timeout')
+
+
+if __name__ == '__main__':
+    unittest.main()
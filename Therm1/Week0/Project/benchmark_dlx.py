@@ -0,0 +1,79 @@
+"""
+Time the dancing links engine on random N x N boards of growing size.
+
+Puzzles are made from a shuffled pattern solution with a fraction of the boxes given, so they
+always have a solution; the diagonals are not units.  On 9 x 9 boards the bitmask engine is
+timed on the same puzzles for comparison.  With about half of the boxes given or fewer, some
+25 x 25 puzzles take hundreds of thousands of search nodes, so the default gives 55%.
+
+    python benchmark_dlx.py --sizes 3 4 5 --puzzles 20 --clues 0.6
+"""
+import argparse
+import random
+from timeit import default_timer as timer
+
+import bitmask_solution
+import dlx_solution
+
+
+def make_puzzle(k, clues, rng):
+    """
+    Random puzzle on an N x N board, N = k * k.
+    Args:
+        clues(float): fraction of the boxes given
+        rng(random.Random)
+    Returns:
+        grid string, '.' for the empty boxes
+    """
+    n = k * k
+
+    def shuffled_lines():
+        return [band * k + line for band in rng.sample(range(k), k) for line in rng.sample(range(k), k)]
+
+    symbols = rng.sample(dlx_solution.SYMBOLS[:n], n)
+    rows, cols = shuffled_lines(), shuffled_lines()
+    solved = [symbols[(k * (r % k) + r // k + c) % n] for r in rows for c in cols]
+    given = set(rng.sample(range(n * n), int(round(clues * n * n))))
+    return ''.join(v if i in given else '.' for i, v in enumerate(solved))
+
+
+def run(engine, puzzles):
+    """
+    Solve every puzzle with a solve(grid, diagonal, stats) function.
+    Returns:
+        (seconds per puzzle, slowest seconds, searched nodes per puzzle)
+    """
+    seconds = []
+    stats = {}
+    for grid in puzzles:
+        start = timer()
+        if not engine(grid, False, stats):
+            raise RuntimeError("no solution found for {}".format(grid))
+        seconds.append(timer() - start)
+    return sum(seconds) / len(puzzles), max(seconds), stats.get('nodes', 0) / len(puzzles)
+
+
+def main(sizes, num_puzzles, clues, seed):
+    rng = random.Random(seed)
+    print("{:>6} {:>8} {:>12} {:>12} {:>10}".format('board', 'engine', 'mean ms', 'slowest ms', 'nodes'))
+    for k in sizes:
+        n = k * k
+        puzzles = [make_puzzle(k, clues, rng) for _ in range(num_puzzles)]
+        engines = [('dlx', dlx_solution.solve)]
+        if n == 9:
+            engines.append(('bitmask', bitmask_solution.solve))
+        for name, engine in engines:
+            mean, slowest, nodes = run(engine, puzzles)
+            print("{:>6} {:>8} {:>12.2f} {:>12.2f} {:>10.1f}".format(
+                '{0}x{0}'.format(n), name, 1000 * mean, 1000 * slowest, nodes))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the dancing links Sudoku engine across board sizes.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2, 3, 4, 5],
+                        help="Square sides k, for N = k * k boxes per unit.")
+    parser.add_argument('--puzzles', type=int, default=20, help="Puzzles per board size.")
+    parser.add_argument('--clues', type=float, default=0.55, help="Fraction of the boxes given.")
+    parser.add_argument('--seed', type=int, default=14)
+    args = parser.parse_args()
+    main(args.sizes, args.puzzles, args.clues, args.seed)
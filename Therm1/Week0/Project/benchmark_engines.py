@@ -0,0 +1,96 @@
+"""
+Compare the Sudoku engines of sudoku_engines on one puzzle corpus.
+
+The corpus is read from files, one 81-character grid per line as for batch_solve, or else made
+of random puzzles: standard ones from shuffled pattern solutions, and diagonal ones from the
+solved example of solution.py with its digits relabelled and the board maybe transposed, which
+keeps the diagonals.  Every answer is checked, and each engine gets the mean and slowest solving
+time and the mean search nodes and propagations per puzzle.
+
+    python benchmark_engines.py --puzzles 50 --clues 0.25
+    PYTHONPATH=../../Planning/Project python benchmark_engines.py hard_puzzles.txt --standard --engines bitmask dlx csp
+"""
+import argparse
+import random
+from timeit import default_timer as timer
+
+import benchmark_dlx
+import solution
+import sudoku_engines
+from batch_solve import read_puzzles
+
+DIAGONAL_EXAMPLE = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+
+
+def make_diagonal_puzzle(clues, rng):
+    """
+    Random diagonal puzzle with a fraction of the boxes given, from the solved example.
+    """
+    solved = solution.solve(DIAGONAL_EXAMPLE)
+    digits = dict(zip('123456789', rng.sample('123456789', 9)))
+    board = [digits[solved[box]] for box in solution.boxes]
+    if rng.random() < 0.5:
+        board = [board[9 * c + r] for r in range(9) for c in range(9)]
+    given = set(rng.sample(range(81), int(round(clues * 81))))
+    return ''.join(v if i in given else '.' for i, v in enumerate(board))
+
+
+def run(engine, puzzles, diagonal):
+    """
+    Solve every puzzle with an engine, checking the answers.
+    Returns:
+        dict of the number solved and the mean and slowest seconds, nodes and propagations
+    """
+    seconds, nodes, propagations, solved = [], 0, 0, 0
+    for grid in puzzles:
+        start = timer()
+        values, stats = sudoku_engines.solve(grid, engine, diagonal)
+        seconds.append(timer() - start)
+        if values and not sudoku_engines.is_solution(grid, values, diagonal):
+            raise RuntimeError("{} gave a wrong solution for {}".format(engine, grid))
+        solved += bool(values)
+        nodes += stats['nodes']
+        propagations += stats['propagations']
+    return {'solved': solved, 'mean': sum(seconds) / len(puzzles), 'slowest': max(seconds),
+            'nodes': nodes / len(puzzles), 'propagations': propagations / len(puzzles)}
+
+
+def main(puzzles, engines, diagonal):
+    print("{} {} puzzles".format(len(puzzles), 'diagonal' if diagonal else 'standard'))
+    print("{:<9} {:>7} {:>10} {:>11} {:>9} {:>13}  {}".format(
+        'engine', 'solved', 'mean ms', 'slowest ms', 'nodes', 'propagations', 'counting'))
+    results = {}
+    for engine in engines:
+        if engine == 'solution' and not diagonal:
+            continue
+        results[engine] = result = run(engine, puzzles, diagonal)
+        print("{:<9} {:>7} {:>10.2f} {:>11.2f} {:>9.1f} {:>13.1f}  {}".format(
+            engine, result['solved'], 1000 * result['mean'], 1000 * result['slowest'], result['nodes'],
+            result['propagations'], sudoku_engines.PROPAGATIONS[engine]))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the Sudoku engines on a shared puzzle corpus.")
+    parser.add_argument('files', nargs='*', help="Puzzle files; random puzzles when none are given.")
+    parser.add_argument('--engines', nargs='+', choices=sorted(sudoku_engines.ENGINES),
+                        default=sorted(sudoku_engines.ENGINES))
+    parser.add_argument('--standard', action='store_true', help="Standard sudoku, without the diagonal units.")
+    parser.add_argument('--puzzles', type=int, default=30, help="Number of random puzzles.")
+    parser.add_argument('--clues', type=float, default=0.3, help="Fraction of the boxes given in random puzzles.")
+    parser.add_argument('--seed', type=int, default=14)
+    args = parser.parse_args()
+
+    diagonal = not args.standard
+    if args.files:
+        puzzles = []
+        for filename in args.files:
+            with open(filename) as f:
+                puzzles.extend(read_puzzles(f))
+    else:
+        rng = random.Random(args.seed)
+        if diagonal:
+            puzzles = [make_diagonal_puzzle(args.clues, rng) for _ in range(args.puzzles)]
+        else:
+            puzzles = [benchmark_dlx.make_puzzle(3, args.clues, rng) for _ in range(args.puzzles)]
+    main(puzzles, args.engines, diagonal)
@@ -0,0 +1,176 @@
+"""
+Sudoku engine working on candidate bitmasks.
+
+The board is a flat list of 81 ints, bit d - 1 of a box being set while digit d is still a
+candidate, so that eliminations, unit scans and board copies are plain integer operations.
+It applies the same strategies as solution.py (elimination, naked twins, only choice and
+depth-first search on the box with fewest candidates) and keeps the diagonal units.
+"""
+
+rows = 'ABCDEFGHI'
+cols = '123456789'
+boxes = [r + c for r in rows for c in cols]
+ALL = 0x1ff
+
+# number of candidates of each 9-bit mask
+POPCOUNT = [bin(mask).count('1') for mask in range(ALL + 1)]
+
+
+def unit_tables(diagonal=True):
+    """
+    Index tables for the units and peers of each box.
+    Args:
+        diagonal(bool): add the two main diagonals as units
+    Returns:
+        (units, peers): units is a list of tuples of box indices, peers a list of tuples of the
+        indices of the other boxes sharing a unit with each box
+    """
+    units = [tuple(9 * r + c for c in range(9)) for r in range(9)]
+    units += [tuple(9 * r + c for r in range(9)) for c in range(9)]
+    units += [tuple(9 * (br + r) + bc + c for r in range(3) for c in range(3))
+              for br in (0, 3, 6) for bc in (0, 3, 6)]
+    if diagonal:
+        units += [tuple(10 * i for i in range(9)), tuple(8 * (i + 1) for i in range(9))]
+    peers = [tuple(sorted({j for unit in units if i in unit for j in unit} - {i})) for i in range(81)]
+    return units, peers
+
+
+TABLES = {diagonal: unit_tables(diagonal) for diagonal in (True, False)}
+
+
+def grid_masks(grid):
+    """
+    Convert a grid string into a list of 81 candidate masks, ALL for empty boxes.
+    """
+    return [ALL if v == '.' else 1 << (int(v) - 1) for v in grid]
+
+
+def mask_values(masks):
+    """
+    Convert candidate masks into the {box: digits} dictionary used by solution.py.
+    """
+    return {box: ''.join(cols[d] for d in range(9) if mask >> d & 1) for box, mask in zip(boxes, masks)}
+
+
+def reduce_puzzle(masks, units, peers, stats=None):
+    """
+    Apply elimination, naked twins and only choice until the board stops changing.
+    Args:
+        masks(list): candidate masks, changed in place
+        stats(dict): optional counters, 'passes' over the board are added
+    Returns:
+        the masks, or False if a box or a digit of a unit has run out of places
+    """
+    changed = True
+    while changed:
+        changed = False
+        if stats is not None:
+            stats['passes'] = stats.get('passes', 0) + 1
+        # Elimination: a solved box removes its digit from its peers
+        for i in range(81):
+            mask = masks[i]
+            if mask == 0:
+                return False
+            if mask & (mask - 1) == 0:
+                for p in peers[i]:
+                    if masks[p] & mask:
+                        masks[p] &= ~mask
+                        changed = True
+        for unit in units:
+            # Naked twins: two boxes left with the same pair remove it from the rest of the unit
+            pairs = set()
+            twin_pairs = set()
+            for i in unit:
+                mask = masks[i]
+                if POPCOUNT[mask] == 2:
+                    if mask in pairs:
+                        twin_pairs.add(mask)
+                    pairs.add(mask)
+            if twin_pairs:
+                twins = 0
+                for pair in twin_pairs:
+                    twins |= pair
+                for i in unit:
+                    mask = masks[i]
+                    if mask & twins and mask not in twin_pairs:
+                        masks[i] = mask & ~twins
+                        changed = True
+            # Only choice: a digit with a single place in the unit goes there
+            once = twice = 0
+            for i in unit:
+                twice |= once & masks[i]
+                once |= masks[i]
+            if once != ALL:
+                return False
+            singles = once & ~twice
+            while singles:
+                bit = singles & -singles
+                singles ^= bit
+                for i in unit:
+                    if masks[i] & bit:
+                        if masks[i] != bit:
+                            masks[i] = bit
+                            changed = True
+                        break
+    return masks
+
+
+def search(masks, units, peers, stats=None):
+    """
+    Reduce the board, then branch on the unsolved box with the fewest candidates.
+    Args:
+        stats(dict): optional counters, 'nodes' searched and 'backtracks' from failed boards are added,
+            as well as the reduce_puzzle ones
+    Returns:
+        the solved masks, or False
+    """
+    if stats is not None:
+        stats['nodes'] = stats.get('nodes', 0) + 1
+    masks = reduce_puzzle(masks, units, peers, stats)
+    if masks is False:
+        if stats is not None:
+            stats['backtracks'] = stats.get('backtracks', 0) + 1
+        return False
+    best = None
+    for i, mask in enumerate(masks):
+        count = POPCOUNT[mask]
+        if count > 1 and (best is None or count < POPCOUNT[masks[best]]):
+            best = i
+            if count == 2:
+                break
+    if best is None:
+        return masks
+    candidates = masks[best]
+    while candidates:
+        bit = candidates & -candidates
+        candidates ^= bit
+        attempt = list(masks)
+        attempt[best] = bit
+        attempt = search(attempt, units, peers, stats)
+        if attempt:
+            return attempt
+    return False
+
+
+def solve(grid, diagonal=True, stats=None):
+    """
+    Find the solution to a Sudoku grid.
+    Args:
+        grid(string): a string representing a sudoku grid.
+            Example: '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+        diagonal(bool): whether the two main diagonals are units too
+        stats(dict): optional search counters, see search
+    Returns:
+        The dictionary representation of the final sudoku grid. False if no solution exists.
+    """
+    units, peers = TABLES[diagonal]
+    masks = search(grid_masks(grid), units, peers, stats)
+    if masks is False:
+        return False
+    return mask_values(masks)
+
+
+if __name__ == '__main__':
+    from solution import display
+    diag_sudoku_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+    display(solve(diag_sudoku_grid))
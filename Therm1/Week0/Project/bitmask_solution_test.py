@@ -0,0 +1,30 @@
+import bitmask_solution
+import solution
+import unittest
+
+
+class TestBitmaskSolve(unittest.TestCase):
+    diagonal_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+    hard_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+
+    def assertValidSolution(self, grid, values, diagonal):
+        units, _ = bitmask_solution.unit_tables(diagonal)
+        for unit in units:
+            self.assertEqual(sorted(values[bitmask_solution.boxes[i]] for i in unit), list('123456789'))
+        for box, v in zip(bitmask_solution.boxes, grid):
+            if v != '.':
+                self.assertEqual(values[box], v)
+
+    def test_solve_matches_solution(self):
+        self.assertEqual(bitmask_solution.solve(self.diagonal_grid), solution.solve(self.diagonal_grid))
+
+    def test_solve_without_diagonals(self):
+        values = bitmask_solution.solve(self.hard_grid, diagonal=False)
+        self.assertValidSolution(self.hard_grid, values, diagonal=False)
+
+    def test_unsolvable(self):
+        self.assertFalse(bitmask_solution.solve('11' + '.' * 79))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,233 @@
+"""
+Sudoku as an exact cover problem, solved with Knuth's Algorithm X on dancing links.
+
+Boards are N x N with N = k * k boxes per unit (4, 9, 16, 25), given as strings of N * N
+characters: the first N of SYMBOLS for the digits, '.' or '0' for empty boxes.  Each placement
+of a digit in a box is a row of the exact cover matrix, covering four constraint columns (the
+box is filled, and the digit is in its row, column and square once) plus one per diagonal it
+lies on when the diagonals are units too.  A solution picks exactly one row per column.
+"""
+
+SYMBOLS = '123456789ABCDEFGHIJKLMNOP'
+ROW_NAMES = 'ABCDEFGHIJKLMNOPQRSTUVWXY'
+
+
+def board_size(grid):
+    """
+    Side of the board of a grid string.
+    Returns:
+        (n, k): n boxes per unit and k boxes per side of a square
+    """
+    k = int(round(len(grid) ** 0.25))
+    n = k * k
+    if n * n != len(grid) or n > len(SYMBOLS):
+        raise ValueError("A grid must have N * N boxes with N = k * k <= {}, not {}".format(len(SYMBOLS), len(grid)))
+    return n, k
+
+
+def box_names(n):
+    """
+    Names of the n * n boxes, row by row: 'A1' ... 'I9' on 9 x 9 boards as in solution.py.
+    """
+    return [r + str(c + 1) for r in ROW_NAMES[:n] for c in range(n)]
+
+
+def cover_columns(n, k, diagonal):
+    """
+    Constraint columns covered by placing each digit in each box.
+    Returns:
+        (num_columns, placements): placements[(box index, digit index)] is the list of the columns
+    """
+    placements = {}
+    for r in range(n):
+        for c in range(n):
+            s = (r // k) * k + c // k
+            for d in range(n):
+                columns = [r * n + c, n * n + r * n + d, 2 * n * n + c * n + d, 3 * n * n + s * n + d]
+                if diagonal and r == c:
+                    columns.append(4 * n * n + d)
+                if diagonal and r + c == n - 1:
+                    columns.append(4 * n * n + n + d)
+                placements[(r * n + c, d)] = columns
+    return 4 * n * n + (2 * n if diagonal else 0), placements
+
+
+# (n, diagonal) -> uncovered DancingLinks of every placement, copied for each puzzle
+_templates = {}
+
+
+class DancingLinks:
+    """
+    Sparse exact cover matrix as circular doubly linked lists of nodes.
+
+    Node 0 is the root, nodes 1 to num_columns the column headers, the others the ones of the
+    matrix.  Links are kept in flat lists indexed by node, so covering a column only relinks
+    integers and uncovering restores them in reverse order.
+    """
+
+    def __init__(self, num_columns, rows):
+        """
+        Args:
+            num_columns(int): number of constraint columns
+            rows(dict): row id -> list of the columns it covers, counted from 0
+        """
+        headers = num_columns + 1
+        self.left = [i - 1 for i in range(headers)]
+        self.right = [i + 1 for i in range(headers)]
+        self.left[0], self.right[-1] = num_columns, 0
+        self.up = list(range(headers))
+        self.down = list(range(headers))
+        self.column = list(range(headers))
+        self.size = [0] * headers
+        self.row = [None] * headers
+        for row_id, columns in rows.items():
+            first = len(self.column)
+            for i, c in enumerate(columns):
+                node, header = first + i, c + 1
+                self.left.append(first + (i - 1) % len(columns))
+                self.right.append(first + (i + 1) % len(columns))
+                self.up.append(self.up[header])
+                self.down.append(header)
+                self.down[self.up[header]] = node
+                self.up[header] = node
+                self.column.append(header)
+                self.row.append(row_id)
+                self.size[header] += 1
+        self.first_node = dict((self.row[node], node) for node in range(len(self.row) - 1, headers - 1, -1))
+
+    def copy(self):
+        """
+        Independent matrix with the same links, cheaper than building it again.
+        """
+        links = DancingLinks.__new__(DancingLinks)
+        for name in ('left', 'right', 'up', 'down', 'size'):
+            setattr(links, name, list(getattr(self, name)))
+        # never changed by covering
+        links.column, links.row, links.first_node = self.column, self.row, self.first_node
+        return links
+
+    def cover(self, c):
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+        right[left[c]], left[right[c]] = right[c], left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]], up[down[j]] = down[j], up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, c):
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = left[right[c]] = c
+
+    def select(self, row_id):
+        """
+        Put a row in the solution up front, covering its columns.
+        Returns:
+            False if one of its columns is already covered by another row
+        """
+        node = self.first_node[row_id]
+        j = node
+        while True:
+            c = self.column[j]
+            if self.left[self.right[c]] != c:
+                return False
+            self.cover(c)
+            j = self.right[j]
+            if j == node:
+                return True
+
+    def search(self, stats=None):
+        """
+        Algorithm X, branching on the column with the fewest rows left.
+        Args:
+            stats(dict): optional counters, 'nodes' searched, 'backtracks' from dead-end columns and
+                'covers' of columns while branching are added
+        Returns:
+            list of the row ids of a solution, or False
+        """
+        right, down, size = self.right, self.down, self.size
+        if stats is not None:
+            stats['nodes'] = stats.get('nodes', 0) + 1
+        if right[0] == 0:
+            return []
+        c = right[0]
+        best = c
+        while c != 0:
+            if size[c] < size[best]:
+                best = c
+                if size[c] <= 1:
+                    break
+            c = right[c]
+        if size[best] == 0:
+            if stats is not None:
+                stats['backtracks'] = stats.get('backtracks', 0) + 1
+            return False
+        self.cover(best)
+        covers = 1
+        r = down[best]
+        while r != best:
+            j = right[r]
+            while j != r:
+                self.cover(self.column[j])
+                covers += 1
+                j = right[j]
+            if stats is not None:
+                stats['covers'] = stats.get('covers', 0) + covers
+                covers = 0
+            solution = self.search(stats)
+            j = self.left[r]
+            while j != r:
+                self.uncover(self.column[j])
+                j = self.left[j]
+            if solution is not False:
+                self.uncover(best)
+                return [self.row[r]] + solution
+            r = down[r]
+        self.uncover(best)
+        return False
+
+
+def solve(grid, diagonal=True, stats=None):
+    """
+    Find the solution to a Sudoku grid of any size N = k * k.
+    Args:
+        grid(string): a string representing a sudoku grid.
+            Example: '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+        diagonal(bool): whether the two main diagonals are units too
+        stats(dict): optional search counters, see DancingLinks.search
+    Returns:
+        The dictionary representation of the final sudoku grid. False if no solution exists.
+    """
+    n, k = board_size(grid)
+    if (n, diagonal) not in _templates:
+        _templates[(n, diagonal)] = DancingLinks(*cover_columns(n, k, diagonal))
+    links = _templates[(n, diagonal)].copy()
+    symbols = SYMBOLS[:n]
+    for i, v in enumerate(grid):
+        if v not in '.0':
+            if v not in symbols or not links.select((i, symbols.index(v))):
+                return False
+    rows = links.search(stats)
+    if rows is False:
+        return False
+    boxes = box_names(n)
+    values = dict((boxes[i], v) for i, v in enumerate(grid) if v not in '.0')
+    values.update((boxes[i], symbols[d]) for i, d in rows)
+    return values
+
+
+if __name__ == '__main__':
+    from solution import display
+    diag_sudoku_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+    display(solve(diag_sudoku_grid))
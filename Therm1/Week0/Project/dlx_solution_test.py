@@ -0,0 +1,51 @@
+import benchmark_dlx
+import dlx_solution
+import random
+import solution
+import unittest
+
+
+class TestDLXSolve(unittest.TestCase):
+    diagonal_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+    hard_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+
+    def assertValidSolution(self, grid, values):
+        n, k = dlx_solution.board_size(grid)
+        names = dlx_solution.box_names(n)
+        board = [[values[names[r * n + c]] for c in range(n)] for r in range(n)]
+        symbols = sorted(dlx_solution.SYMBOLS[:n])
+        for i in range(n):
+            self.assertEqual(sorted(board[i]), symbols)
+            self.assertEqual(sorted(row[i] for row in board), symbols)
+            r, c = k * (i // k), k * (i % k)
+            self.assertEqual(sorted(board[r + a][c + b] for a in range(k) for b in range(k)), symbols)
+        for name, v in zip(names, grid):
+            if v != '.':
+                self.assertEqual(values[name], v)
+
+    def test_solve_matches_solution(self):
+        self.assertEqual(dlx_solution.solve(self.diagonal_grid), solution.solve(self.diagonal_grid))
+
+    def test_solve_without_diagonals(self):
+        stats = {}
+        values = dlx_solution.solve(self.hard_grid, diagonal=False, stats=stats)
+        self.assertValidSolution(self.hard_grid, values)
+        self.assertGreater(stats['nodes'], 0)
+
+    def test_larger_boards(self):
+        rng = random.Random(0)
+        for k in (2, 4, 5):
+            grid = benchmark_dlx.make_puzzle(k, 0.6, rng)
+            self.assertValidSolution(grid, dlx_solution.solve(grid, diagonal=False))
+
+    def test_unsolvable(self):
+        self.assertFalse(dlx_solution.solve('11' + '.' * 79))
+        self.assertFalse(dlx_solution.solve('1.2.' + '.' * 11 + '1', diagonal=True))
+
+    def test_bad_size(self):
+        with self.assertRaises(ValueError):
+            dlx_solution.solve('.' * 80)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,20 +1,81 @@
+import itertools
+from collections import deque
 
 assignments = []
+record_assignments = False
+# ids of the boards recorded in assignments, never reused within a run
+board_ids = itertools.count()
 rows = 'ABCDEFGHI'
 cols = '123456789'
 
 
+class Board(dict):
+    """
+    A values dictionary with a board_id, the boards of solve and search while record_assignments is set.
+    """
+
+    def __init__(self, values):
+        dict.__init__(self, values)
+        self.board_id = next(board_ids)
+
+
 def assign_value(values, box, value):
     """
     Please use this function to update your values dictionary!
-    Assigns a value to a given box. If it updates the board record it.
+    Assigns a value to a given box. While record_assignments is set the change is
+    appended to assignments as a ('set', board, box, old, new) delta, board being the
+    board_id of values, or None for a dictionary that is not a recorded Board.
+    Recording is off by default, see replay_assignments for turning deltas into boards.
     """
+    if record_assignments:
+        assignments.append(('set', getattr(values, 'board_id', None), box, values.get(box), value))
     values[box] = value
-    if len(value) == 1:
-        assignments.append(values.copy())
     return values
 
 
+def copy_values(values):
+    """
+    Copy a values dictionary to branch on, recording the new Board while record_assignments is set.
+    """
+    if not record_assignments:
+        return values.copy()
+    new_values = Board(values)
+    assignments.append(('copy', new_values.board_id, getattr(values, 'board_id', None)))
+    return new_values
+
+
+def replay_assignments(records):
+    """
+    Rebuild board snapshots from recorded deltas.
+    Boards are told apart by the board_id in the board field of the records: 'new' records
+    carry the starting board of solve, 'copy' records a branch of search and 'set' records a change.
+    Args:
+        records(list): the assignments recorded while record_assignments was set
+    Returns:
+        generator of values dictionaries, one for every box set to a single digit,
+        as expected by visualize.visualize_assignments
+    Raises:
+        ValueError: for a 'copy' or 'set' record of a board no earlier record started
+    """
+    boards = {}
+    for record in records:
+        kind, board = record[0], record[1]
+        if kind == 'new':
+            boards[board] = dict(record[2])
+            continue
+        source = record[2] if kind == 'copy' else board
+        if source not in boards:
+            raise ValueError("{} record of unknown board {}".format(kind, source))
+        if kind == 'copy':
+            boards[board] = dict(boards[source])
+        else:
+            _, _, box, old, new = record
+            values = boards[board]
+            values[box] = new
+            if len(new) == 1:
+                yield dict(values)
+
+
 def naked_twins(values):
     """
     Strategy 3: Naked Twins
@@ -77,6 +138,8 @@ units = dict((s, [u for u in unitlist if s in u]) for s in boxes)
 peers = dict((s, set(sum(units[s], [])) - set([s])) for s in boxes)
 diagonal_units = diagonal(rows, cols)
 unitlist = unitlist + diagonal_units
+# indices in unitlist of the units holding each box, diagonals included
+box_units = dict((s, [i for i, u in enumerate(unitlist) if s in u]) for s in boxes)
 
 
 def grid_values(grid):
@@ -138,16 +201,31 @@ def only_choice(values):
         for n in '123456789':
             boxes = [box for box in unit if n in values[box]]
             if len(boxes) == 1:
-                values[boxes[0]] = n
+                values = assign_value(values, boxes[0], n)
     return values
 
 
-def reduce_puzzle(values):
+def reduce_puzzle(values, changed=None, stats=None):
     """
-    Combines each strategy to find a solution.
+    Combines each strategy to find a solution, see propagate.
     If a solution is found we return the values.
     If no solution is found we stop trying.
     """
+    return propagate(values, changed, stats)
+
+
+def add_stats(stats, boxes_examined, units_examined):
+    if stats is not None:
+        stats['boxes'] = stats.get('boxes', 0) + boxes_examined
+        stats['units'] = stats.get('units', 0) + units_examined
+
+
+def sweep_reduce_puzzle(values, stats=None):
+    """
+    Combines each strategy by sweeping the whole board with each of them until no new box is solved.
+    Kept to compare against propagate, which reaches the same boards with less work.
+    stats is an optional dictionary the 'boxes' and 'units' examined are added to.
+    """
     stalled = False
     while not stalled:
         # Check how many boxes have a determined value
@@ -161,6 +239,7 @@ def reduce_puzzle(values):
 
         # One choice strategy
         values = only_choice(values)
+        add_stats(stats, len(boxes), len(unitlist))
 
         # Check how many boxes have a determined value, to compare
         solved_values_after = len([box for box in values.keys() if len(values[box]) == 1])
@@ -172,47 +251,125 @@ def reduce_puzzle(values):
     return values
 
 
-def search(values):
+def propagate(values, changed=None, stats=None):
+    """
+    Strategy 4: Constraint Propagation
+    Applies elimination, naked twins and only choice from a work queue instead of sweeping the board:
+    a box is examined again only when its values change, eliminating a solved value from its peers,
+    and each unit holding it is then queued for naked twins and only choice.
+    Args:
+        values(dict): a dictionary of the form {'box_name': '123456789', ...}
+        changed(iterable): boxes changed since the board was last reduced, every box by default
+        stats(dict): optional counters, the 'boxes' and 'units' examined are added
+    Returns:
+        the reduced values dictionary, or False if a box or a digit of a unit has run out of places
+    """
+    box_queue = deque(boxes if changed is None else changed)
+    queued_boxes = set(box_queue)
+    unit_queue = deque()
+    queued_units = set()
+
+    def update(box, value):
+        if values[box] != value:
+            assign_value(values, box, value)
+            if box not in queued_boxes:
+                queued_boxes.add(box)
+                box_queue.append(box)
+
+    while box_queue or unit_queue:
+        if box_queue:
+            box = box_queue.popleft()
+            queued_boxes.discard(box)
+            add_stats(stats, 1, 0)
+            value = values[box]
+            if len(value) == 0:
+                return False
+            # Elimination
+            if len(value) == 1:
+                for peer in peers[box]:
+                    if value in values[peer]:
+                        update(peer, values[peer].replace(value, ''))
+            for i in box_units[box]:
+                if i not in queued_units:
+                    queued_units.add(i)
+                    unit_queue.append(i)
+            continue
+        i = unit_queue.popleft()
+        queued_units.discard(i)
+        add_stats(stats, 0, 1)
+        unit = unitlist[i]
+        # Naked twins
+        pairs = [values[box] for box in unit if len(values[box]) == 2]
+        twins = set(v for v in pairs if pairs.count(v) > 1)
+        for v in twins:
+            for box in unit:
+                if values[box] not in twins:
+                    update(box, values[box].replace(v[0], '').replace(v[1], ''))
+        # Only choice, and a digit left with no place at all leaves the board without solution
+        for n in '123456789':
+            places = [box for box in unit if n in values[box]]
+            if len(places) == 1:
+                update(places[0], n)
+            elif not places:
+                return False
+    return values
+
+
+def search(values, changed=None, stats=None):
     """
     Strategy 3: Search
     Pick a box with a minimal number of possible values.
     Try to solve each of the puzzles obtained by choosing each of these values, recursively.
+    Only the boxes in changed are queued when reducing, the branching box for the recursive calls.
+    stats is an optional dictionary the 'nodes' searched and 'backtracks' from failed boards are added to,
+    as well as the 'boxes' and 'units' examined by propagate.
     """
-    values = reduce_puzzle(values)
+    if stats is not None:
+        stats['nodes'] = stats.get('nodes', 0) + 1
+    values = reduce_puzzle(values, changed, stats)
     if values is False:
+        if stats is not None:
+            stats['backtracks'] = stats.get('backtracks', 0) + 1
         return False
     if all(len(values[s]) == 1 for s in boxes):
         return values
     n, s = min((len(values[s]), s) for s in boxes if len(values[s]) > 1)
     for value in values[s]:
-        new_sudoku = values.copy()
+        new_sudoku = copy_values(values)
         new_sudoku = assign_value(new_sudoku, s, value)
-        attempt = search(new_sudoku)
+        attempt = search(new_sudoku, [s], stats)
         if attempt:
             return attempt
 
 
-def solve(grid):
+def solve(grid, stats=None):
     """
     Find the solution to a Sudoku grid.
     Args:
         grid(string): a string representing a sudoku grid.
             Example: '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+        stats(dict): optional search counters, see search
     Returns:
         The dictionary representation of the final sudoku grid. False if no solution exists.
     """
     values = grid_values(grid)
-    values = reduce_puzzle(values)
-    values = search(values)
+    if record_assignments:
+        values = Board(values)
+        assignments.append(('new', values.board_id, dict(values)))
+    values = reduce_puzzle(values, stats=stats)
+    if values is False:
+        return False
+    values = search(values, [], stats)
     return values
 
 if __name__ == '__main__':
     diag_sudoku_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+    record_assignments = True
     display(solve(diag_sudoku_grid))
 
     try:
         from visualize import visualize_assignments
-        visualize_assignments(assignments)
+        visualize_assignments(list(replay_assignments(assignments)))
 
     except SystemExit:
         pass
@@ -94,5 +94,77 @@ class TestDiagonalSudoku(unittest.TestCase):
     def test_solve(self):
         self.assertEqual(solution.solve(self.diagonal_grid), self.solved_diag_sudoku)
 
+    def test_search_stats(self):
+        stats = {}
+        solution.solve(self.diagonal_grid, stats)
+        self.assertGreaterEqual(stats['nodes'], 1)
+        again = {}
+        solution.solve(self.diagonal_grid, again)
+        self.assertEqual(again, stats)
+
+
+class TestPropagation(unittest.TestCase):
+    diagonal_grid = TestDiagonalSudoku.diagonal_grid
+    # two 4s left on the anti-diagonal by the board sweep, which only eliminates from row, column and square peers
+    diagonal_conflict_grid = '....2.9.548..5......5....67....9.5.......3...5....6.9.7......5.1.....67......21..'
+
+    def sweep_to_fixpoint(self, values, stats=None):
+        while True:
+            before = dict(values)
+            values = solution.sweep_reduce_puzzle(values, stats)
+            if values is False or values == before:
+                return values
+
+    def test_matches_sweep(self):
+        values = solution.grid_values(self.diagonal_grid)
+        self.assertEqual(solution.propagate(dict(values)), self.sweep_to_fixpoint(dict(values)))
+
+    def test_less_work(self):
+        values = solution.grid_values(self.diagonal_grid)
+        sweep, queue = {}, {}
+        self.sweep_to_fixpoint(dict(values), sweep)
+        solution.propagate(dict(values), stats=queue)
+        self.assertLess(queue['boxes'], sweep['boxes'])
+        self.assertLess(queue['units'], sweep['units'])
+
+    def test_diagonal_conflict(self):
+        values = solution.solve(self.diagonal_conflict_grid)
+        for unit in solution.unitlist:
+            self.assertEqual(sorted(values[box] for box in unit), list('123456789'))
+
+
+class TestAssignmentRecording(unittest.TestCase):
+    diagonal_grid = TestDiagonalSudoku.diagonal_grid
+
+    def tearDown(self):
+        solution.record_assignments = False
+        del solution.assignments[:]
+
+    def test_not_recorded_by_default(self):
+        solution.solve(self.diagonal_grid)
+        self.assertEqual(solution.assignments, [])
+
+    def test_replay_rebuilds_boards(self):
+        solution.record_assignments = True
+        solved = solution.solve(self.diagonal_grid)
+        snapshots = list(solution.replay_assignments(solution.assignments))
+        self.assertEqual(snapshots[-1], solved)
+        self.assertTrue(all(len(s) == 81 for s in snapshots))
+        self.assertTrue(all(len(record) <= 5 for record in solution.assignments))
+
+    def test_boards_have_distinct_ids(self):
+        solution.record_assignments = True
+        solution.solve(self.diagonal_grid)
+        solution.solve(self.diagonal_grid)
+        started = [record[1] for record in solution.assignments if record[0] in ('new', 'copy')]
+        self.assertEqual(len(started), len(set(started)))
+
+    def test_replay_rejects_unknown_boards(self):
+        solution.record_assignments = True
+        solution.assign_value(solution.grid_values(self.diagonal_grid), 'A1', '2')
+        with self.assertRaises(ValueError):
+            list(solution.replay_assignments(solution.assignments))
+
+
 if __name__ == '__main__':
     unittest.main()
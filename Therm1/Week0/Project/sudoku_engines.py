@@ -0,0 +1,142 @@
+"""
+One solve call for every Sudoku engine of the project.
+
+    values, stats = sudoku_engines.solve(grid, engine='csp', diagonal=True)
+
+gives the {box: digit} dictionary of solution.py (False when there is no solution) and the
+engine's counters: 'nodes' for the boards or assignments searched, 'backtracks' for the ones
+that failed, and 'propagations' for the work of its inference, in the unit of
+PROPAGATIONS[engine].
+
+The 'csp' engine uses the aimacode CSP solver of the Planning project, and is only there when
+aimacode can be imported, e.g. with ../../Planning/Project on the PYTHONPATH; register_csp adds
+it once the path is set later on.
+"""
+import bitmask_solution
+import dlx_solution
+import solution
+from OOPsolution import Sudoku
+
+csp = None
+
+PROPAGATIONS = {
+    'bitmask': 'passes over the board',
+    'csp': 'constraint checks',
+    'dlx': 'columns covered',
+    'oop': 'candidates removed',
+    'solution': 'boxes and units examined',
+}
+
+
+def solve_solution(grid, diagonal):
+    if not diagonal:
+        raise ValueError("the solution engine always uses the diagonal units")
+    stats = {}
+    values = solution.solve(grid, stats)
+    return values, {'nodes': stats.get('nodes', 0), 'backtracks': stats.get('backtracks', 0),
+                    'propagations': stats.get('boxes', 0) + stats.get('units', 0)}
+
+
+def solve_oop(grid, diagonal):
+    sudoku = Sudoku(diagonal=diagonal)
+    values = sudoku.solve(grid)
+    return values or False, {'nodes': sudoku.nodes, 'backtracks': sudoku.backtracks,
+                             'propagations': sum(stat['removed'] for stat in sudoku.stats.values())}
+
+
+def solve_bitmask(grid, diagonal):
+    stats = {}
+    values = bitmask_solution.solve(grid, diagonal, stats)
+    return values, {'nodes': stats.get('nodes', 0), 'backtracks': stats.get('backtracks', 0),
+                    'propagations': stats.get('passes', 0)}
+
+
+def solve_dlx(grid, diagonal):
+    stats = {}
+    values = dlx_solution.solve(grid, diagonal, stats)
+    return values, {'nodes': stats.get('nodes', 0), 'backtracks': stats.get('backtracks', 0),
+                    'propagations': stats.get('covers', 0)}
+
+
+def solve_csp(grid, diagonal):
+    """
+    Arc consistency, then backtracking search with minimum remaining values and maintained arc
+    consistency.  The diagonals are added to the neighbors of the aimacode Sudoku when needed;
+    backtracks are the variables unassigned after all of their values failed.
+    """
+    problem = csp.Sudoku(grid)
+    cells = csp.flatten(problem.rows)
+    if diagonal:
+        neighbors = dict((cell, set(peers)) for cell, peers in problem.neighbors.items())
+        for unit in ([cells[10 * i] for i in range(9)], [cells[8 * (i + 1)] for i in range(9)]):
+            for cell in unit:
+                neighbors[cell].update(set(unit) - {cell})
+        problem.neighbors = neighbors
+    checks = [0]
+
+    def constraint(A, a, B, b):
+        checks[0] += 1
+        return a != b
+
+    problem.constraints = constraint
+    unassigned = [0]
+    unassign = problem.unassign
+
+    def count_unassign(var, assignment):
+        unassigned[0] += var in assignment
+        unassign(var, assignment)
+
+    problem.unassign = count_unassign
+    assignment = None
+    if csp.AC3(problem):
+        assignment = csp.backtracking_search(problem, select_unassigned_variable=csp.mrv, inference=csp.mac)
+    values = dict((box, assignment[cell]) for box, cell in zip(solution.boxes, cells)) if assignment else False
+    return values, {'nodes': problem.nassigns, 'backtracks': unassigned[0], 'propagations': checks[0]}
+
+
+ENGINES = {'bitmask': solve_bitmask, 'dlx': solve_dlx, 'oop': solve_oop, 'solution': solve_solution}
+
+
+def register_csp():
+    """
+    Add the 'csp' engine to ENGINES if aimacode can be imported.
+    Returns:
+        True if the engine is available
+    """
+    global csp
+    if csp is None:
+        try:
+            from aimacode import csp
+        except ImportError:
+            return False
+    ENGINES['csp'] = solve_csp
+    return True
+
+
+register_csp()
+
+
+def solve(grid, engine='bitmask', diagonal=True):
+    """
+    Solve a 9 x 9 grid with one of the ENGINES.
+    Args:
+        grid(string): 81 characters, '.' for empty boxes
+        engine(string): name in ENGINES
+        diagonal(bool): whether the two main diagonals are units too
+    Returns:
+        (values, stats): the solved values dictionary or False, and the engine's 'nodes',
+        'backtracks' and 'propagations' counts
+    """
+    return ENGINES[engine](grid, diagonal)
+
+
+def is_solution(grid, values, diagonal=True):
+    """
+    Check that values fills every unit with the nine digits and keeps the givens of grid.
+    """
+    if not values:
+        return False
+    units, _ = bitmask_solution.unit_tables(diagonal)
+    boxes = bitmask_solution.boxes
+    return (all(sorted(values[boxes[i]] for i in unit) == list('123456789') for unit in units) and
+            all(v == '.' or values[box] == v for box, v in zip(boxes, grid)))
@@ -0,0 +1,56 @@
+import os
+import sys
+import unittest
+
+import sudoku_engines
+
+# the aimacode CSP solver of the Planning project, for the csp engine
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'Planning', 'Project'))
+sudoku_engines.register_csp()
+
+
+class TestEngines(unittest.TestCase):
+    diagonal_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+    hard_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+    # a standard puzzle none of the engines solves without a failed guess
+    guessing_grid = '...16.9..1.8..2..5.4....1..3.5.7..4.2.........7.........1..9....2..3....6........'
+
+    def test_diagonal(self):
+        for engine in sudoku_engines.ENGINES:
+            values, stats = sudoku_engines.solve(self.diagonal_grid, engine)
+            self.assertTrue(sudoku_engines.is_solution(self.diagonal_grid, values), engine)
+            self.assertGreater(stats['nodes'], 0, engine)
+            self.assertGreater(stats['propagations'], 0, engine)
+            self.assertLessEqual(stats['backtracks'], stats['nodes'], engine)
+
+    def test_backtracks(self):
+        # the csp engine breaks ties between variables at random, so its guesses may all succeed
+        for engine in ('bitmask', 'dlx', 'oop'):
+            _, stats = sudoku_engines.solve(self.guessing_grid, engine, diagonal=False)
+            self.assertGreater(stats['backtracks'], 0, engine)
+
+    def test_standard(self):
+        for engine in sudoku_engines.ENGINES:
+            if engine != 'solution':
+                values, _ = sudoku_engines.solve(self.hard_grid, engine, diagonal=False)
+                self.assertTrue(sudoku_engines.is_solution(self.hard_grid, values, diagonal=False), engine)
+
+    def test_unsolvable(self):
+        for engine in sudoku_engines.ENGINES:
+            values, _ = sudoku_engines.solve('11' + '.' * 79, engine)
+            self.assertFalse(values, engine)
+
+    @unittest.skipIf(sudoku_engines.csp is None, "aimacode is not available")
+    def test_csp_keeps_diagonals(self):
+        values, _ = sudoku_engines.solve(self.diagonal_grid, 'csp')
+        self.assertEqual(values, sudoku_engines.solve(self.diagonal_grid, 'solution')[0])
+
+    def test_is_solution(self):
+        values, _ = sudoku_engines.solve(self.diagonal_grid)
+        self.assertFalse(sudoku_engines.is_solution(self.diagonal_grid.replace('2', '3', 1), values))
+        values['A1'], values['A2'] = values['A2'], values['A1']
+        self.assertFalse(sudoku_engines.is_solution(self.diagonal_grid, values))
+
+
+if __name__ == '__main__':
+    unittest.main()
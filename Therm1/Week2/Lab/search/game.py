@@ -261,6 +261,98 @@ def reconstituteGrid(bitRep):
   width, height = bitRep[:2]
   return Grid(width, height, bitRepresentation= bitRep[2:])
 
+class FoodGrid:
+  """
+  An immutable Grid of booleans packed into a single integer, for search states.
+
+  Cell (x,y) is bit x * height + y, the cell index order of Grid, so hashing and
+  comparing is one integer operation and removing food makes a new FoodGrid
+  without copying any lists.  Reading works as for Grid: grid[x][y], count(),
+  asList() (in the same order) and str().
+  """
+  def __init__(self, width, height, bits=0):
+    self.width = width
+    self.height = height
+    self.bits = bits
+
+  def fromGrid(grid):
+    "Packs the True cells of a Grid into a FoodGrid."
+    bits = 0
+    for x, y in grid.asList():
+      bits |= 1 << (x * grid.height + y)
+    return FoodGrid(grid.width, grid.height, bits)
+  fromGrid = staticmethod(fromGrid)
+
+  def toGrid(self):
+    g = Grid(self.width, self.height)
+    for x, y in self.asList():
+      g[x][y] = True
+    return g
+
+  def __getitem__(self, x):
+    if x < 0: x += self.width
+    if not 0 <= x < self.width: raise IndexError('FoodGrid index out of range')
+    return FoodColumn(self.bits >> (x * self.height), self.height)
+
+  def without(self, x, y):
+    "Returns the grid with cell (x,y) set to False; the grid itself if it already is."
+    bit = 1 << (x * self.height + y)
+    if not self.bits & bit:
+      return self
+    return FoodGrid(self.width, self.height, self.bits & ~bit)
+
+  def __str__(self):
+    return str(self.toGrid())
+
+  def __eq__(self, other):
+    if not isinstance(other, FoodGrid): return False
+    return self.bits == other.bits and self.height == other.height and self.width == other.width
+
+  def __ne__(self, other):
+    return not self == other
+
+  def __hash__(self):
+    return hash(self.bits)
+
+  def copy(self):
+    return self
+
+  def deepCopy(self):
+    return self
+
+  def shallowCopy(self):
+    return self
+
+  def count(self, item =True ):
+    trueCount = bin(self.bits).count('1')
+    if item: return trueCount
+    return self.width * self.height - trueCount
+
+  def asList(self, key = True):
+    if not key:
+      return self.toGrid().asList(False)
+    list = []
+    bits = self.bits
+    while bits:
+      low = bits & -bits
+      list.append(divmod(low.bit_length() - 1, self.height))
+      bits ^= low
+    return list
+
+class FoodColumn:
+  "Column x of a FoodGrid, indexed by y."
+  def __init__(self, bits, height):
+    self.bits = bits
+    self.height = height
+
+  def __getitem__(self, y):
+    if y < 0: y += self.height
+    if not 0 <= y < self.height: raise IndexError('FoodColumn index out of range')
+    return bool(self.bits >> y & 1)
+
+  def __len__(self):
+    return self.height
+
 ####################################
 # Parts you shouldn't have to read #
 ####################################
@@ -704,3 +796,33 @@ class Game:
           return
     self.display.finish()
 
+  def runHeadless( self, copyStates=False ):
+    """
+    Plays the game to the end for batch runs, without a display, stdout
+    muting or timeouts.  Unless copyStates is set, agents without an
+    observationFunction are handed the game state itself rather than a deep
+    copy on every move, so they must not modify it.
+    """
+    for agent in self.agents:
+      if "registerInitialState" in dir(agent):
+        agent.registerInitialState(self.state.deepCopy())
+
+    agentIndex = self.startingIndex
+    numAgents = len( self.agents )
+    while not self.gameOver:
+      agent = self.agents[agentIndex]
+      if 'observationFunction' in dir( agent ):
+        observation = agent.observationFunction(self.state.deepCopy())
+      elif copyStates:
+        observation = self.state.deepCopy()
+      else:
+        observation = self.state
+      action = agent.getAction(observation)
+      self.moveHistory.append( (agentIndex, action) )
+      self.state = self.state.generateSuccessor( agentIndex, action )
+      self.rules.process(self.state, self)
+      agentIndex = ( agentIndex + 1 ) % numAgents
+
+    for agent in self.agents:
+      if "final" in dir( agent ):
+        agent.final( self.state )
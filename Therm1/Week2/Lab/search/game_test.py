@@ -0,0 +1,35 @@
+import unittest
+
+from game import FoodGrid, Grid
+
+class FoodGridTest(unittest.TestCase):
+
+  def setUp(self):
+    self.grid = Grid(3, 2)
+    self.grid[0][1] = True
+    self.grid[1][0] = True
+    self.food = FoodGrid.fromGrid(self.grid)
+
+  def testMatchesGrid(self):
+    for x in range(-3, 3):
+      for y in range(-2, 2):
+        self.assertEqual(self.food[x][y], self.grid[x][y])
+    self.assertEqual(self.food.asList(), self.grid.asList())
+    self.assertEqual(self.food.count(), 2)
+
+  def testOutOfRange(self):
+    # the next column's bits must not show through
+    self.assertRaises(IndexError, lambda: self.food[0][2])
+    self.assertRaises(IndexError, lambda: self.food[0][-3])
+    self.assertRaises(IndexError, lambda: self.food[3])
+    self.assertRaises(IndexError, lambda: self.food[-4])
+
+  def testWithout(self):
+    eaten = self.food.without(1, 0)
+    self.assertFalse(eaten[1][0])
+    self.assertTrue(self.food[1][0])
+    self.assertTrue(eaten.without(1, 0) is eaten)
+    self.assertNotEqual(eaten, self.food)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -8,10 +8,17 @@
 
 from util import manhattanDistance
 from game import Grid
+import hashlib
 import os
 import random
+import tempfile
 
 VISIBILITY_MATRIX_CACHE = {}
+# layout hash -> (cell ids, all-pairs maze distance matrix), see Layout.initializeDistanceMatrix
+DISTANCE_MATRIX_CACHE = {}
+# directory to save distance matrices in per layout hash, so that later runs load them;
+# None (the default) keeps them in memory only
+DISTANCE_CACHE_DIR = None
 
 class Layout:
   """
@@ -28,6 +35,8 @@ class Layout:
     self.numGhosts = 0
     self.processLayoutText(layoutText)
     self.layoutText = layoutText
+    self.cellIds = None
+    self.distances = None
     # self.initializeVisibilityMatrix()
     
   def getNumGhosts(self):
@@ -54,6 +63,39 @@ class Layout:
     else:
       self.visibility = VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)]
       
+  def getLayoutHash(self):
+    return hashlib.sha1('\n'.join(self.layoutText)).hexdigest()
+
+  def initializeDistanceMatrix(self):
+    """
+    Computes the maze distance between every pair of open cells, by a breadth
+    first search from each of them, unless this layout's table is already in
+    DISTANCE_MATRIX_CACHE or saved under DISTANCE_CACHE_DIR.
+
+    self.cellIds maps each open (x,y) to its row and column in self.distances,
+    an int16 NumPy matrix holding -1 for cells that can not reach each other.
+    """
+    global DISTANCE_MATRIX_CACHE
+    key = self.getLayoutHash()
+    if key not in DISTANCE_MATRIX_CACHE:
+      cells = [(x, y) for x in range(self.width) for y in range(self.height) if not self.walls[x][y]]
+      cellIds = dict((cell, i) for i, cell in enumerate(cells))
+      distances = loadDistanceMatrix(key, len(cells))
+      if distances is None:
+        distances = computeDistanceMatrix(cells, cellIds)
+        saveDistanceMatrix(key, distances)
+      DISTANCE_MATRIX_CACHE[key] = (cellIds, distances)
+    self.cellIds, self.distances = DISTANCE_MATRIX_CACHE[key]
+
+  def getMazeDistance(self, pos1, pos2):
+    """
+    The number of steps between two open cells, -1 if there is no path.
+    The distance table is computed on first use.
+    """
+    if self.distances is None:
+      self.initializeDistanceMatrix()
+    return int(self.distances[self.cellIds[pos1], self.cellIds[pos2]])
+
   def isWall(self, pos):
     x, col = pos
     return self.walls[x][col]
@@ -83,7 +125,9 @@ class Layout:
     return "\n".join(self.layoutText)
     
   def deepCopy(self):
-    return Layout(self.layoutText[:])
+    layout = Layout(self.layoutText[:])
+    layout.cellIds, layout.distances = self.cellIds, self.distances
+    return layout
     
   def processLayoutText(self, layoutText):
     """
@@ -121,6 +165,57 @@ class Layout:
     elif layoutChar in  ['1', '2', '3', '4']:
       self.agentPositions.append( (int(layoutChar), (x,y)))
       self.numGhosts += 1 
+
+def computeDistanceMatrix(cells, cellIds):
+  "Breadth first search from every cell, see Layout.initializeDistanceMatrix."
+  import numpy
+  neighbors = [[cellIds[n] for n in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)) if n in cellIds]
+               for x, y in cells]
+  distances = numpy.empty((len(cells), len(cells)), dtype=numpy.int16)
+  for source in range(len(cells)):
+    row = [-1] * len(cells)
+    row[source] = 0
+    frontier = [source]
+    steps = 0
+    while frontier:
+      steps += 1
+      nextFrontier = []
+      for cell in frontier:
+        for n in neighbors[cell]:
+          if row[n] < 0:
+            row[n] = steps
+            nextFrontier.append(n)
+      frontier = nextFrontier
+    distances[source] = row
+  return distances
+
+def loadDistanceMatrix(key, numCells):
+  "The saved matrix of a layout hash, or None if there is none of the right size."
+  if DISTANCE_CACHE_DIR is None: return None
+  import numpy
+  filename = os.path.join(DISTANCE_CACHE_DIR, key + '.npy')
+  if not os.path.exists(filename): return None
+  try:
+    distances = numpy.load(filename)
+  except (IOError, ValueError):
+    return None
+  if distances.shape != (numCells, numCells) or distances.dtype != numpy.int16: return None
+  return distances
+
+def saveDistanceMatrix(key, distances):
+  "Saves a matrix under its layout hash; a cache that can not be written is skipped."
+  if DISTANCE_CACHE_DIR is None: return
+  import numpy
+  try:
+    if not os.path.isdir(DISTANCE_CACHE_DIR): os.makedirs(DISTANCE_CACHE_DIR)
+    # write then rename, so that concurrent games never read a partial file
+    fd, tmp = tempfile.mkstemp(suffix='.npy', dir=DISTANCE_CACHE_DIR)
+    with os.fdopen(fd, 'wb') as f:
+      numpy.save(f, distances)
+    os.rename(tmp, os.path.join(DISTANCE_CACHE_DIR, key + '.npy'))
+  except (IOError, OSError):
+    pass
+
 def getLayout(name, back = 2):
   if name.endswith('.lay'):
     layout = tryToLoad('layouts/' + name)
@@ -0,0 +1,49 @@
+import shutil
+import tempfile
+import unittest
+
+import layout
+from layout import Layout
+from pacman import GameState
+from searchAgents import mazeDistance
+
+# an open corridor and a cell walled off from it
+LAYOUT_TEXT = ['%%%%%%%',
+               '%P. %.%',
+               '%%%%%%%']
+
+class MazeDistanceTest(unittest.TestCase):
+
+  def setUp(self):
+    self.layout = Layout(LAYOUT_TEXT)
+    self.state = GameState()
+    self.state.initialize(self.layout, 0)
+
+  def tearDown(self):
+    layout.DISTANCE_MATRIX_CACHE.clear()
+
+  def testDistances(self):
+    self.assertEqual(self.layout.getMazeDistance((1, 1), (3, 1)), 2)
+    self.assertEqual(self.layout.getMazeDistance((3, 1), (3, 1)), 0)
+    self.assertEqual(mazeDistance((1, 1), (3, 1), self.state), 2)
+
+  def testUnreachable(self):
+    self.assertEqual(self.layout.getMazeDistance((1, 1), (5, 1)), -1)
+    self.assertRaises(ValueError, mazeDistance, (1, 1), (5, 1), self.state)
+    self.assertRaises(ValueError, mazeDistance, (5, 1), (2, 1), self.state)
+
+  def testDiskCacheIsOptIn(self):
+    self.assertTrue(layout.DISTANCE_CACHE_DIR is None)
+    cacheDir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, cacheDir)
+    layout.DISTANCE_CACHE_DIR = cacheDir
+    try:
+      self.layout.initializeDistanceMatrix()
+      layout.DISTANCE_MATRIX_CACHE.clear()
+      loaded = layout.loadDistanceMatrix(self.layout.getLayoutHash(), len(self.layout.cellIds))
+    finally:
+      layout.DISTANCE_CACHE_DIR = None
+    self.assertTrue((loaded == self.layout.distances).all())
+
+if __name__ == '__main__':
+  unittest.main()
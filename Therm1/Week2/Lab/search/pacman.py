@@ -515,6 +515,14 @@ def readCommand( argv ):
                     help='Turns on exception handling and timeouts during games', default=False)
   parser.add_option('--timeout', dest='timeout', type='int',
                     help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+  parser.add_option('--batch', action='store_true', dest='batch',
+                    help='Play the games headless in worker processes and write the results as JSON', default=False)
+  parser.add_option('--workers', dest='workers', type='int',
+                    help=default('Number of worker processes for --batch, 0 for one per CPU'), default=0)
+  parser.add_option('--output', dest='output',
+                    help=default('File the --batch results are written to, - for stdout'), default='-')
+  parser.add_option('--copyStates', action='store_true', dest='copyStates',
+                    help='In --batch, hand agents a deep copy of the state on every move', default=False)
 
   options, otherjunk = parser.parse_args(argv)
   if len(otherjunk) != 0:
@@ -529,7 +537,7 @@ def readCommand( argv ):
   if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
 
   # Choose a Pacman agent
-  noKeyboard = options.gameToReplay == None and (options.textGraphics or options.quietGraphics)
+  noKeyboard = options.gameToReplay == None and (options.textGraphics or options.quietGraphics or options.batch)
   pacmanType = loadAgent(options.pacman, noKeyboard)
   agentOpts = parseAgentArgs(options.agentArgs)
   if options.numTraining > 0:
@@ -547,6 +555,17 @@ def readCommand( argv ):
   ghostType = loadAgent(options.ghost, noKeyboard)
   args['ghosts'] = [ghostType( i+1 ) for i in range( options.numGhosts )]
 
+  # Batch runs have no display and their own arguments
+  if options.batch:
+    if options.numTraining > 0 or options.record or options.gameToReplay != None:
+      raise Exception('--batch can not be combined with training, recording or replaying games')
+    args['numGames'] = options.numGames
+    args['workers'] = options.workers
+    args['output'] = options.output
+    args['copyStates'] = options.copyStates
+    args['catchExceptions'] = options.catchExceptions
+    return args
+
   # Choose a display format
   if options.quietGraphics:
       import textDisplay
@@ -657,6 +676,97 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
 
   return games
 
+# Arguments of the batch games, set in each worker process by _initBatchWorker
+_batchArgs = None
+
+def _initBatchWorker( layout, pacman, ghosts, copyStates, catchExceptions ):
+  global _batchArgs
+  _batchArgs = (layout, pacman, ghosts, copyStates, catchExceptions)
+
+def _playBatchGame( task ):
+  """
+  Plays one headless game from a seed and returns its result dictionary.
+  """
+  import textDisplay, traceback
+  index, seed = task
+  layout, pacman, ghosts, copyStates, catchExceptions = _batchArgs
+  random.seed(seed)
+  GameState.getAndResetExplored()
+  rules = ClassicGameRules()
+  game = rules.newGame( layout, pacman, ghosts, textDisplay.NullGraphics(), True, catchExceptions )
+  result = {'game': index, 'seed': seed, 'crashed': False}
+  start = time.time()
+  try:
+    game.runHeadless(copyStates)
+  except Exception:
+    if not catchExceptions: raise
+    result['crashed'] = True
+    result['error'] = traceback.format_exc().strip().split('\n')[-1]
+  result['seconds'] = time.time() - start
+  result['score'] = game.state.getScore()
+  result['win'] = game.state.isWin()
+  result['moves'] = len(game.moveHistory)
+  return result
+
+def runBatch( layout, pacman, ghosts, numGames, workers=0, output='-', copyStates=False, catchExceptions=False ):
+  """
+  Plays numGames headless games spread over worker processes (one per CPU
+  when workers is 0) and writes the per-game results and their summary as
+  JSON to the output file, or stdout for '-'.  Each game is seeded from the
+  random module, so --fixRandomSeed makes a batch repeatable.  There are no
+  move timeouts, and with catchExceptions a crashing agent only ends its own
+  game.
+  """
+  import multiprocessing, json
+  if workers <= 0: workers = multiprocessing.cpu_count()
+  workers = min(workers, numGames)
+  tasks = [(i, random.randrange(2 ** 31)) for i in range(numGames)]
+  initArgs = (layout, pacman, ghosts, copyStates, catchExceptions)
+
+  start = time.time()
+  if workers <= 1:
+    _initBatchWorker(*initArgs)
+    games = map(_playBatchGame, tasks)
+  else:
+    pool = multiprocessing.Pool(workers, _initBatchWorker, initArgs)
+    try:
+      games = pool.map(_playBatchGame, tasks, max(1, numGames // (4 * workers)))
+    finally:
+      pool.terminate()
+  wallSeconds = time.time() - start
+
+  games.sort(key=lambda game: game['game'])
+  count = float(max(1, len(games)))
+  wins = len([game for game in games if game['win']])
+  results = {
+    'layoutHash': layout.getLayoutHash(),
+    'pacman': pacman.__class__.__name__,
+    'ghosts': [ghost.__class__.__name__ for ghost in ghosts[:layout.getNumGhosts()]],
+    'workers': workers,
+    'copyStates': copyStates,
+    'summary': {
+      'games': len(games),
+      'wins': wins,
+      'winRate': wins / count,
+      'averageScore': sum([game['score'] for game in games]) / count,
+      'crashes': len([game for game in games if game['crashed']]),
+      'averageMoves': sum([game['moves'] for game in games]) / count,
+      'averageSeconds': sum([game['seconds'] for game in games]) / count,
+      'wallSeconds': wallSeconds,
+      'gamesPerSecond': len(games) / wallSeconds if wallSeconds > 0 else None,
+    },
+    'games': games,
+  }
+
+  if output == '-':
+    json.dump(results, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+  else:
+    f = open(output, 'w')
+    try: json.dump(results, f, indent=2, sort_keys=True)
+    finally: f.close()
+  return results
+
 if __name__ == '__main__':
   """
   The main function called when pacman.py is run
@@ -669,7 +779,10 @@ if __name__ == '__main__':
   > python pacman.py --help
   """
   args = readCommand( sys.argv[1:] ) # Get game components based on input
-  runGames( **args )
+  if 'workers' in args:
+    runBatch( **args )
+  else:
+    runGames( **args )
 
   # import cProfile
   # cProfile.run("runGames( **args )")
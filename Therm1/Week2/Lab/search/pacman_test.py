@@ -0,0 +1,84 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+
+import layout
+import pacman
+from ghostAgents import RandomGhost
+from pacmanAgents import GreedyAgent
+
+class CrashingAgent(GreedyAgent):
+  "Raises on every third move"
+
+  def __init__(self):
+    GreedyAgent.__init__(self)
+    self.moves = 0
+
+  def getAction(self, state):
+    self.moves += 1
+    if self.moves % 3 == 0:
+      raise RuntimeError('agent crashed')
+    return GreedyAgent.getAction(self, state)
+
+class RunBatchTest(unittest.TestCase):
+
+  def setUp(self):
+    self.layout = layout.getLayout('smallClassic')
+    self.ghosts = [RandomGhost(i + 1) for i in range(self.layout.getNumGhosts())]
+    fd, self.output = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    self.addCleanup(os.remove, self.output)
+
+  def runBatch(self, pacmanAgent, numGames, workers, catchExceptions=False):
+    random.seed('pacman_test')
+    return pacman.runBatch(self.layout, pacmanAgent, self.ghosts, numGames, workers,
+                           self.output, False, catchExceptions)
+
+  def testWorkersAgree(self):
+    serial = self.runBatch(GreedyAgent(), 4, 1)
+    parallel = self.runBatch(GreedyAgent(), 4, 2)
+    self.assertEqual(serial['workers'], 1)
+    self.assertEqual(parallel['workers'], 2)
+    for field in ['game', 'seed', 'score', 'moves', 'win', 'crashed']:
+      self.assertEqual([game[field] for game in serial['games']],
+                       [game[field] for game in parallel['games']])
+    self.assertEqual([game['game'] for game in serial['games']], range(4))
+
+  def testSummary(self):
+    results = self.runBatch(GreedyAgent(), 3, 1)
+    self.assertEqual(sorted(results.keys()),
+                     ['copyStates', 'games', 'ghosts', 'layoutHash', 'pacman', 'summary', 'workers'])
+    self.assertEqual(results['pacman'], 'GreedyAgent')
+    self.assertEqual(results['ghosts'], ['RandomGhost'] * self.layout.getNumGhosts())
+    summary = results['summary']
+    self.assertEqual(sorted(summary.keys()),
+                     ['averageMoves', 'averageScore', 'averageSeconds', 'crashes', 'games',
+                      'gamesPerSecond', 'wallSeconds', 'winRate', 'wins'])
+    games = results['games']
+    self.assertEqual(summary['games'], 3)
+    self.assertEqual(summary['crashes'], 0)
+    self.assertEqual(summary['wins'], len([game for game in games if game['win']]))
+    self.assertAlmostEqual(summary['averageScore'], sum([game['score'] for game in games]) / 3.0)
+    self.assertAlmostEqual(summary['averageMoves'], sum([game['moves'] for game in games]) / 3.0)
+    # the JSON written to the output file holds the same results
+    f = open(self.output)
+    try: written = json.load(f)
+    finally: f.close()
+    self.assertEqual(written['summary']['games'], 3)
+    self.assertEqual([game['score'] for game in written['games']], [game['score'] for game in games])
+
+  def testCrashingAgent(self):
+    results = self.runBatch(CrashingAgent(), 2, 1, catchExceptions=True)
+    self.assertEqual(results['summary']['crashes'], 2)
+    for game in results['games']:
+      self.assertTrue(game['crashed'])
+      self.assertFalse(game['win'])
+      self.assertTrue('agent crashed' in game['error'])
+
+  def testCrashingAgentRaises(self):
+    self.assertRaises(RuntimeError, self.runBatch, CrashingAgent(), 1, 1)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -31,6 +31,7 @@ Good luck and happy searching!
 from game import Directions
 from game import Agent
 from game import Actions
+from game import FoodGrid
 import util
 import time
 import search
@@ -360,10 +361,11 @@ class FoodSearchProblem:
   
   A search state in this problem is a tuple ( pacmanPosition, foodGrid ) where
     pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
-    foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food 
+    foodGrid:       a FoodGrid (see game.py) of either True or False, specifying remaining food;
+                    it reads like a Grid but is immutable, so states hash and copy cheaply
   """
   def __init__(self, startingGameState):
-    self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
+    self.start = (startingGameState.getPacmanPosition(), FoodGrid.fromGrid(startingGameState.getFood()))
     self.walls = startingGameState.getWalls()
     self.startingGameState = startingGameState
     self._expanded = 0
@@ -384,8 +386,7 @@ class FoodSearchProblem:
       dx, dy = Actions.directionToVector(direction)
       nextx, nexty = int(x + dx), int(y + dy)
       if not self.walls[nextx][nexty]:
-        nextFood = state[1].copy()
-        nextFood[nextx][nexty] = False
+        nextFood = state[1].without(nextx, nexty)
         successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
     return successors
 
@@ -422,8 +423,8 @@ def foodHeuristic(state, problem):
   inadmissible or inconsistent heuristics may find optimal solutions, so be careful.
   
   The state is a tuple ( pacmanPosition, foodGrid ) where foodGrid is a 
-  Grid (see game.py) of either True or False. You can call foodGrid.asList()
-  to get a list of food coordinates instead.
+  FoodGrid (see game.py) of either True or False, read like a Grid. You can call
+  foodGrid.asList() to get a list of food coordinates instead.
   
   If you want access to info like walls, capsules, etc., you can query the problem.
   For example, problem.walls gives you a Grid of where the walls are.
@@ -531,11 +532,20 @@ def mazeDistance(point1, point2, gameState):
   Example usage: mazeDistance( (2,4), (5,6), gameState)
   
   This might be a useful helper function for your ApproximateSearchAgent.
+  Distances are looked up in the layout's all-pairs table (see layout.py),
+  computed once per layout; without NumPy a search is run instead.  Points
+  with no path between them raise a ValueError.
   """
   x1, y1 = point1
   x2, y2 = point2
   walls = gameState.getWalls()
   assert not walls[x1][y1], 'point1 is a wall: ' + point1
   assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-  prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False)
-  return len(search.bfs(prob))
\ No newline at end of file
+  try:
+    distance = gameState.data.layout.getMazeDistance(point1, point2)
+  except ImportError:
+    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False)
+    return len(search.bfs(prob))
+  if distance < 0:
+    raise ValueError('no path from %s to %s' % (str(point1), str(point2)))
+  return distance
\ No newline at end of file